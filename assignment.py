@@ -0,0 +1,165 @@
+"""
+
+Description: Truck Assignment Module for the WGUPS Parcel Service Program
+
+Turns the free-text special notes of the packages into structured constraints and assigns the
+packages to truck loads (fleet.Trip) with a greedy clustering heuristic, so the daily manifests do
+not have to be written by hand. The loads respect truck capacity, required trucks, packages that
+must be delivered together and the time packages become available at the hub.
+
+"""
+
+# Python core libraries - Functionality
+import datetime
+import re
+from collections import namedtuple
+
+# Project modules - Routing data
+from fleet import Trip
+from routing import parse_deadline
+
+# Structured form of a package's special notes and deadline
+PackageConstraints = namedtuple("PackageConstraints", ["ID", "truck", "ready", "deliver_with", "deadline"])
+
+TRUCK_NOTE = re.compile(r"can only be on truck\s+(\d+)", re.IGNORECASE)
+DELAYED_NOTE = re.compile(r"delayed on flight.*?until\s+(\d{1,2}:\d{2}\s*[ap]\.?m\.?)", re.IGNORECASE)
+DELIVER_WITH_NOTE = re.compile(r"must be delivered with\s+([\d,\s]+)", re.IGNORECASE)
+WRONG_ADDRESS_NOTE = re.compile(r"wrong address listed", re.IGNORECASE)
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  NOTE PARSING FUNCTION                                         |
+#     | |                      parse_constraints(package, start, correction_time)                        |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function reads a package's notes and deadline into PackageConstraints:
+#     |                "Can only be on truck 2" sets the required truck, "Delayed on flight---will not arrive
+#     |                to depot until 9:05 am" sets the ready time, "Must be delivered with 13, 15" lists the
+#     |                packages that must ride on the same truck, and "Wrong address listed" makes the package
+#     |                ready at correction_time (when the corrected address is known). Packages without a
+#     |                delay are ready at start.
+#     |
+#     |   Time Complexity: O(1)
+# '''
+def parse_constraints(package, start=datetime.timedelta(hours=8), correction_time=None):
+    notes = package.notes or ""
+    truck = None
+    ready = start
+    deliver_with = ()
+
+    match = TRUCK_NOTE.search(notes)
+    if match:
+        truck = int(match.group(1))
+    match = DELAYED_NOTE.search(notes)
+    if match:
+        ready = max(ready, parse_deadline(match.group(1).replace(".", "").upper()))
+    match = DELIVER_WITH_NOTE.search(notes)
+    if match:
+        deliver_with = tuple(int(packageID) for packageID in re.findall(r"\d+", match.group(1)))
+    if correction_time is not None and WRONG_ADDRESS_NOTE.search(notes):
+        ready = max(ready, correction_time)
+
+    deadline = getattr(package, "deadlineTime", None)
+    if deadline is None and not hasattr(package, "deadlineTime"):
+        deadline = parse_deadline(package.deadline)
+    return PackageConstraints(package.ID, truck, ready, deliver_with, deadline)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                 TRUCK ASSIGNMENT FUNCTION                                      |
+    |                               Time Complexity: O(n log n + n * t)                              |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This function assigns packages to truck loads. First, packages that must be delivered
+                 together are merged into one unit (union-find), which takes the earliest deadline, the
+                 latest ready time and the required truck of its members. Units are then placed in
+                 order of deadline (deadline packages first, earliest first) and ready time:
+
+                   - a unit joins the open load whose seed address (the first stop placed in it) is
+                     nearest to the unit's address, among loads with room left and a compatible
+                     required truck (units for a required truck stay on that truck's load, since
+                     loads of the same truck cannot run at the same time);
+                   - a unit may not make a load that carries deadline packages leave later, but it may
+                     delay a load of end-of-day packages;
+                   - if no load fits, the unit opens a new load.
+
+                 The loads are returned as fleet.Trip objects ordered by ready time, with deadline loads
+                 first, which is the dispatch order simulate_fleet expects. The heuristic does not
+                 guarantee that every deadline is met; simulate the plan to check it.
+
+    Time Complexity: O(n log n + n * t) where n is the number of packages and t the number of loads.
+
+'''
+
+
+def assign_packages(packages, matrix, capacity=16, start=datetime.timedelta(hours=8), correction_time=None):
+    packages = list(packages)
+    constraints = {package.ID: parse_constraints(package, start, correction_time) for package in packages}
+    addresses = {package.ID: matrix.index_of(package.street) for package in packages}
+
+    # Union-find over "must be delivered with" groups
+    parent = {packageID: packageID for packageID in constraints}
+
+    def find(packageID):
+        while parent[packageID] != packageID:
+            parent[packageID] = parent[parent[packageID]]
+            packageID = parent[packageID]
+        return packageID
+
+    for constraint in constraints.values():
+        for other in constraint.deliver_with:
+            if other in parent:
+                parent[find(other)] = find(constraint.ID)
+
+    groups = {}
+    for package in packages:
+        groups.setdefault(find(package.ID), []).append(package.ID)
+
+    units = []
+    for members in groups.values():
+        if len(members) > capacity:
+            raise ValueError(f"Packages {members} must ride together but exceed the capacity of {capacity}")
+        trucks = {constraints[packageID].truck for packageID in members} - {None}
+        if len(trucks) > 1:
+            raise ValueError(f"Packages {members} must ride together but require trucks {sorted(trucks)}")
+        deadlines = [constraints[packageID].deadline for packageID in members
+                     if constraints[packageID].deadline is not None]
+        units.append((min(deadlines) if deadlines else None,
+                      max(constraints[packageID].ready for packageID in members),
+                      trucks.pop() if trucks else None,
+                      addresses[members[0]],
+                      members))
+
+    # Deadline units first (earliest deadline first), then by ready time
+    units.sort(key=lambda unit: (unit[0] is None, unit[0] or datetime.timedelta(0), unit[1]))
+
+    loads = []  # [ready, truck, deadline, seed address, package IDs]
+    for deadline, ready, truck, addy, members in units:
+        best = None
+        bestCost = None
+        # Keep a required truck's packages together, since its loads cannot run at the same time
+        pinned = truck is not None and any(load[1] == truck for load in loads)
+        for load in loads:
+            if len(load[4]) + len(members) > capacity:
+                continue
+            if truck is not None and load[1] is not None and load[1] != truck:
+                continue
+            if pinned and load[1] != truck:
+                continue
+            if ready > load[0] and (load[2] is not None or deadline is not None):
+                continue  # Never hold back a load that carries deadline packages
+            cost = matrix.distance(addy, load[3])
+            if bestCost is None or cost < bestCost:
+                best, bestCost = load, cost
+        if best is None:
+            loads.append([ready, truck, deadline, addy, list(members)])
+            continue
+        best[0] = max(best[0], ready)
+        best[1] = best[1] if best[1] is not None else truck
+        if deadline is not None:
+            best[2] = deadline if best[2] is None else min(best[2], deadline)
+        best[4].extend(members)
+
+    loads.sort(key=lambda load: (load[0], load[2] is None, load[2] or datetime.timedelta(0)))
+    return [Trip(load[4], load[0], load[1]) for load in loads]
@@ -0,0 +1,267 @@
+"""
+
+Description: Benchmark Suite for the WGUPS Parcel Service Program
+
+Generates synthetic cities (an address book, a metric distance table in the lower-triangular format
+of distanceCSV.csv and a package manifest in the format of packageCSV.csv) at configurable sizes and
+times the main stages of the program against them: loading the data, the HashTableWChains
+operations, truckDeliverPackages and the status lookups. Every stage reports its throughput and its
+peak memory, and the results can be written as JSON to track regressions between versions.
+
+Usage: python benchmark.py [--sizes 100 1000 10000] [--output results.json]
+
+"""
+
+# Python core libraries - Functionality
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+# Project modules - Routing data
+import main
+import routing
+from distances import DistanceMatrix
+from timeline import StatusTimeline
+
+# One measured stage: the manifest size, the stage name, wall time in seconds, the number of
+# operations done, operations per second and the peak memory allocated by Python during the stage.
+BenchmarkResult = namedtuple("BenchmarkResult", ["size", "name", "seconds", "operations", "throughput",
+                                                 "peak_kb"])
+
+# Share of packages given each deadline in a synthetic manifest; the rest are due at end of day
+DEADLINE_SHARES = (("9:00 AM", 0.05), ("10:30 AM", 0.15))
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  CITY GENERATOR FUNCTION                                       |
+#     | |                       generate_city(directory, packages, addresses, seed)                      |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function writes addressCSV.csv, distanceCSV.csv and packageCSV.csv for a random
+#     |                city to directory and returns their paths. Addresses are random points in a 20 x 20
+#     |                mile square, address 0 being the hub (main.HUB). Distances are the straight-line
+#     |                distances between the points times a road factor of 1.3, rounded to a tenth of a
+#     |                mile, so they satisfy the triangle inequality as closely as the rounding allows.
+#     |                Packages go to random addresses other than the hub, with deadlines drawn from
+#     |                DEADLINE_SHARES. The default number of addresses is half the number of packages,
+#     |                between 27 (the WGU address book) and 2000.
+#     |
+#     |   Time Complexity: O(a^2 + p) for a addresses and p packages
+# '''
+def generate_city(directory, packages, addresses=None, seed=0):
+    if addresses is None:
+        addresses = max(27, min(packages // 2, 2000))
+    rng = random.Random(seed)
+    points = [(rng.uniform(0, 20), rng.uniform(0, 20)) for _ in range(addresses)]
+
+    address_file = os.path.join(directory, "addressCSV.csv")
+    distance_file = os.path.join(directory, "distanceCSV.csv")
+    package_file = os.path.join(directory, "packageCSV.csv")
+    streets = [main.HUB] + [f"{100 + i} Synthetic St" for i in range(1, addresses)]
+
+    with open(address_file, "w", newline="") as addyCSV:
+        writer = csv.writer(addyCSV)
+        for i, street in enumerate(streets):
+            writer.writerow([i, "Hub" if i == 0 else f"Stop {i}", street])
+
+    with open(distance_file, "w", newline="") as disCSV:
+        writer = csv.writer(disCSV)
+        for i, (x1, y1) in enumerate(points):
+            row = [f"{math.hypot(x1 - x2, y1 - y2) * 1.3:.1f}" for x2, y2 in points[:i + 1]]
+            writer.writerow(row + [""] * (addresses - i - 1))
+
+    with open(package_file, "w", newline="") as packageCSV:
+        writer = csv.writer(packageCSV)
+        writer.writerow(["ID", "STREET", "CITY", "STATE", "ZIP", "DEADLINE", "WEIGHT", "NOTES"])
+        for packageID in range(1, packages + 1):
+            deadline = "EOD"
+            draw = rng.random()
+            for clock, share in DEADLINE_SHARES:
+                if draw < share:
+                    deadline = clock
+                    break
+                draw -= share
+            writer.writerow([packageID, streets[rng.randrange(1, addresses)], "Salt Lake City", "UT",
+                             str(rng.randrange(84100, 84200)), deadline, rng.randint(1, 100), ""])
+
+    return address_file, distance_file, package_file
+
+
+def _measure(size, name, function, operations, memory, setup=None):
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    value = function()
+    seconds = time.perf_counter() - start
+    peak_kb = None
+    if memory:
+        # Run the stage a second time under tracemalloc, so the traced run does not skew the timing
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        function()
+        peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    count = operations(value) if callable(operations) else operations
+    throughput = round(count / seconds, 1) if seconds > 0 else None
+    return value, BenchmarkResult(size, name, round(seconds, 6), count, throughput, peak_kb)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                  BENCHMARK SUITE FUNCTION                                      |
+    |                             Time Complexity: O(a^2 + p * s) per size                           |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This function generates a city for every manifest size and measures, in order:
+
+                   - load_distances_csv: parsing the address and distance CSV files;
+                   - load_distances_snapshot: memory-mapping the binary snapshot of the same matrix;
+                   - load_packages: streaming the manifest into a HashTableWChains;
+                   - hash_insert / hash_search / hash_street_lookup / hash_remove: the hash table
+                     operations on a new table holding every package;
+                   - route_trucks: truckDeliverPackages over the whole manifest in truck loads of
+                     load_size packages, every truck leaving the hub at 8:00 (operations are packages),
+                     and route_trucks_headless, the same without status logs and progress records;
+                   - status_build / status_lookup / status_snapshots: building the StatusTimeline,
+                     status_at for every package at three times and statuses_at_times for every half
+                     hour of the day.
+
+                 The program's shared context is pointed at the synthetic data while a size runs and
+                 restored afterwards. With memory=False the tracemalloc pass is skipped.
+
+    Time Complexity: O(a^2 + p * s) per size, for a addresses, p packages and s = load_size.
+
+'''
+
+
+def run_benchmarks(sizes, addresses=None, load_size=16, seed=0, memory=True, directory=None):
+    results = []
+    saved_context = main.context
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        try:
+            for size in sizes:
+                cityDir = os.path.join(workdir, str(size))
+                os.makedirs(cityDir)
+                address_file, distance_file, package_file = generate_city(cityDir, size, addresses, seed)
+                cache_file = os.path.join(cityDir, ".distances.snapshot")
+                results.extend(_run_size(size, address_file, distance_file, package_file, cache_file, load_size,
+                                         memory))
+        finally:
+            main.context = saved_context
+    return results
+
+
+def _run_size(size, address_file, distance_file, package_file, cache_file, load_size, memory):
+    results = []
+
+    def record(name, function, operations, setup=None):
+        value, result = _measure(size, name, function, operations, memory, setup)
+        results.append(result)
+        return value
+
+    matrix = record("load_distances_csv", lambda: DistanceMatrix.from_csv(address_file, distance_file),
+                    lambda matrix: matrix.size * matrix.size)
+    matrix.save_snapshot(cache_file, b"\0" * 32)
+    record("load_distances_snapshot", lambda: DistanceMatrix.from_snapshot(cache_file),
+           matrix.size * matrix.size)
+
+    packageHash = record("load_packages",
+                         lambda: main.loadPackageData(package_file, table=main.HashTableWChains()), size)
+    packages = [package for packageID, package in packageHash.items()]
+    streets = sorted({package.street for package in packages})
+
+    def insert_all():
+        table = main.HashTableWChains()
+        for package in packages:
+            table.insert(package.ID, package)
+        return table
+
+    table = record("hash_insert", insert_all, size)
+    record("hash_search", lambda: [table.search(package.ID) for package in packages], size)
+    record("hash_street_lookup", lambda: [table.get_package_ids_by_street(street) for street in streets],
+           len(streets))
+
+    def remove_all():
+        for package in packages:
+            table.remove(package.ID)
+
+    def refill():
+        for package in packages:
+            if table.search(package.ID) is None:
+                table.insert(package.ID, package)
+
+    record("hash_remove", remove_all, size, setup=refill)
+
+    # Route the manifest against the synthetic data through the program's shared context
+    main.context = main.DeliveryContext(address_file, distance_file, package_file, distance_matrix=matrix)
+    packages = [package for packageID, package in main.context.packageHash.items()]
+    start = datetime.timedelta(hours=8)
+    routing._load_numpy()  # Import NumPy before timing, not in the first routing stage
+    loads = [[package.ID for package in packages[i:i + load_size]] for i in range(0, len(packages), load_size)]
+
+    def route_all(headless=False):
+        for truck_num, load in enumerate(loads, 1):
+            truck = main.Trucks(18, 0.0, main.HUB, start, list(load))
+            main.truckDeliverPackages(truck, truck_num, headless=headless)
+
+    record("route_trucks", route_all, size)
+    record("route_trucks_headless", lambda: route_all(headless=True), size)
+
+    timeline = record("status_build", lambda: StatusTimeline(packages, main.ADDRESS_HISTORY), size)
+    times = [datetime.timedelta(hours=9), datetime.timedelta(hours=10, minutes=25), datetime.timedelta(hours=13)]
+    record("status_lookup",
+           lambda: [timeline.status_at(package.ID, when) for when in times for package in packages],
+           size * len(times))
+    halfHours = [datetime.timedelta(hours=8, minutes=30 * i) for i in range(21)]
+    record("status_snapshots", lambda: timeline.statuses_at_times(halfHours), size * len(halfHours))
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the WGUPS routing program on synthetic cities.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="package manifest sizes to generate (default: 100 1000 10000)")
+    parser.add_argument("--addresses", type=int, default=None,
+                        help="number of addresses per city (default: half the packages, 27 to 2000)")
+    parser.add_argument("--load-size", type=int, default=16, help="packages per truck load (default: 16)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the city generator")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory pass")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.addresses, args.load_size, args.seed, memory=not args.no_memory)
+
+    for result in results:
+        throughput = f"{result.throughput:,.0f}/s" if result.throughput is not None else "-"
+        peak = f"{result.peak_kb:,.0f} KiB" if result.peak_kb is not None else "-"
+        print(f"{result.size:>8} {result.name:<24} {result.seconds:>10.4f} s {throughput:>16} {peak:>14}")
+
+    if args.output:
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": routing._load_numpy() is not None,
+            "sizes": args.sizes,
+            "load_size": args.load_size,
+            "seed": args.seed,
+            "results": [result._asdict() for result in results],
+        }
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
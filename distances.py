@@ -0,0 +1,278 @@
+"""
+
+Description: Distance Matrix Module for the WGUPS Parcel Service Program
+
+Parses the address book (addressCSV.csv) and the lower-triangular distance table (distanceCSV.csv)
+exactly once into an exact street -> index dictionary and a dense, symmetric, float-typed matrix.
+Every distance lookup made by the routing code afterwards is a dictionary hit and an array index,
+instead of a substring scan over the address rows and a float() parse of a string cell.
+
+DistanceProvider is the interface the routing code uses for distances (see betweenst in main.py).
+DistanceMatrix is the dense implementation; providers.py has a sparse nearest-neighbor graph and
+coordinate-based estimates for address books too large for a dense matrix.
+
+"""
+
+# Python core libraries - Functionality
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+# Binary snapshot layout: magic, byte order flag, SHA-256 of the source CSVs, matrix size, text block
+# length, then the JSON address text block padded to 8 bytes, then size * size float64 distances.
+SNAPSHOT_MAGIC = b"WGUDMAT1"
+SNAPSHOT_HEADER = struct.Struct("<8sB32sQQ")
+
+# Picklable description of a matrix copied into a shared memory block (see DistanceMatrix.share): the
+# block name, the matrix size and the address book. Worker processes attach to the block by name.
+SharedMatrixHandle = namedtuple("SharedMatrixHandle", ["name", "size", "streets", "names"])
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                  DISTANCE PROVIDER CLASS                                       |
+    |                                   Time Complexity: O(1)                                        |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class is the interface every distance provider implements: an address book (the
+                 streets and names by address index) and the distance between two address indices. The
+                 routing code only uses these methods, so any provider can be used for a delivery day.
+                 Subclasses implement distance(); dense providers (dense = True) also return a row
+                 that is a float64 buffer, which the routers read in place with NumPy.
+    Methods:
+        1. __init__: Builds the street -> index dictionary for the given streets.
+        2. index_of: Returns the address index of a street.
+        3. distance: Returns the distance between two address indices (implemented by subclasses).
+        4. distances: Returns the distances from one address index to a list of address indices.
+        5. row: Returns the distances from one address index to every address index.
+        6. between: Returns the distance between two street addresses.
+
+    Time Complexity:
+        - __init__: O(n) where n is the number of addresses.
+        - index_of: O(1) average for exact matches, O(n) for the legacy substring fallback.
+        - distances: O(k) distance() calls for k targets.
+        - row: O(n) distance() calls.
+        - between: O(1) average, plus the distance() call.
+
+'''
+
+
+class DistanceProvider:
+    dense = False
+
+    def __init__(self, streets, names):
+        self.size = len(streets)
+        self.streets = streets
+        self.names = names
+        self.index = {street: i for i, street in enumerate(streets)}
+
+    def index_of(self, street):
+        addressID = self.index.get(street)
+        if addressID is None:
+            # Fall back to the original substring match (e.g. a street without its suite number)
+            for i, candidate in enumerate(self.streets):
+                if street in candidate:
+                    return i
+        return addressID
+
+    def distance(self, addy1, addy2):
+        raise NotImplementedError
+
+    def distances(self, addy, targets):
+        distance = self.distance
+        return array('d', [distance(addy, target) for target in targets])
+
+    def row(self, addy):
+        return self.distances(addy, range(self.size))
+
+    def between(self, street1, street2):
+        return self.distance(self.index_of(street1), self.index_of(street2))
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                   DISTANCE MATRIX CLASS                                        |
+    |                                   Time Complexity: O(1)                                        |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class is the dense DistanceProvider: the parsed address book and distance table.
+                 The distances are stored in a single flat, row-major array of doubles (size x size)
+                 with both triangles filled in, so distance(i, j) == distance(j, i) without checking
+                 for empty cells.
+    Methods:
+        1. __init__: Builds the street -> index dictionary for the given streets and distance values.
+        2. from_csv: Loads the address book and the lower-triangular distance table from CSV files.
+        3. distance: Returns the distance between two address indices.
+        4. distances: Returns the distances from one address index to a list of address indices.
+        5. row: Returns the distances from one address index to every other address index.
+        6. save_snapshot: Writes the matrix to a binary snapshot file tagged with the source digest.
+        7. from_snapshot: Memory-maps a snapshot file; the distances are used in place, not copied.
+        8. load: Loads the matrix from the snapshot if it matches the CSV files, otherwise parses the
+                 CSV files and rewrites the snapshot.
+        9. share: Copies the distances into a shared memory block for other processes.
+        10. attach: Builds a matrix over a shared memory block created by share(), without copying it.
+
+    Time Complexity:
+        - __init__: O(n) where n is the number of addresses.
+        - from_csv: O(n^2) where n is the number of addresses.
+        - distance: O(1)
+        - distances: O(k) for k targets.
+        - row: O(1), the row is a view into the matrix and is not copied.
+        - save_snapshot: O(n^2)
+        - from_snapshot: O(n) for the address text, O(1) for the distances.
+        - load: O(size of the CSV files) to hash them, plus the parse on a cache miss.
+        - share: O(n^2)
+        - attach: O(n) for the address book, O(1) for the distances.
+
+'''
+
+
+class DistanceMatrix(DistanceProvider):
+    dense = True
+
+    def __init__(self, streets, names, values, source=None):
+        super().__init__(streets, names)
+        if len(values) != self.size * self.size:
+            raise ValueError(f"Expected {self.size * self.size} distances, got {len(values)}")
+        self.values = values
+        # Memory map or shared memory block backing `values` when loaded from a snapshot or attached
+        # to a shared matrix (kept open for the matrix' lifetime)
+        self.source = source
+
+    @classmethod
+    def from_csv(cls, address_file, distance_file):
+        streets, names = read_address_book(address_file)
+        size = len(streets)
+        values = array('d', [0.0]) * (size * size)
+        with open(distance_file) as disCSV:
+            for i, row in enumerate(csv.reader(disCSV)):
+                if i >= size:
+                    break
+                for j, cell in enumerate(row[:size]):
+                    if cell != '':
+                        distance = float(cell)
+                        values[i * size + j] = distance
+                        values[j * size + i] = distance
+        return cls(streets, names, values)
+
+    def distance(self, addy1, addy2):
+        return self.values[addy1 * self.size + addy2]
+
+    def distances(self, addy, targets):
+        row = self.row(addy)
+        return array('d', [row[target] for target in targets])
+
+    def row(self, addy):
+        start = addy * self.size
+        return memoryview(self.values)[start:start + self.size]
+
+    def save_snapshot(self, path, digest):
+        text = json.dumps({"streets": self.streets, "names": self.names}).encode("utf-8")
+        text += b"\0" * (-(SNAPSHOT_HEADER.size + len(text)) % 8)
+        byteorder = 1 if sys.byteorder == "little" else 0
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as snapshot:
+            snapshot.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, byteorder, digest, self.size, len(text)))
+            snapshot.write(text)
+            snapshot.write(memoryview(self.values).cast("B"))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def from_snapshot(cls, path, digest=None):
+        with open(path, "rb") as snapshot:
+            mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, byteorder, snapshotDigest, size, textLength = SNAPSHOT_HEADER.unpack_from(mapped, 0)
+            if magic != SNAPSHOT_MAGIC or byteorder != (1 if sys.byteorder == "little" else 0):
+                raise ValueError(f"{path} is not a distance snapshot for this machine")
+            if digest is not None and snapshotDigest != digest:
+                raise ValueError(f"{path} does not match the source CSV files")
+            start = SNAPSHOT_HEADER.size
+            text = json.loads(bytes(mapped[start:start + textLength]).rstrip(b"\0").decode("utf-8"))
+            start += textLength
+            end = start + size * size * 8
+            if len(mapped) < end:
+                raise ValueError(f"{path} is truncated")
+            values = memoryview(mapped)[start:end].cast("d")
+        except (ValueError, struct.error):
+            mapped.close()
+            raise
+        return cls(text["streets"], text["names"], values, source=mapped)
+
+    def share(self):
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(create=True, size=max(self.size * self.size * 8, 1))
+        memoryview(block.buf)[:self.size * self.size * 8] = memoryview(self.values).cast("B")
+        return block, SharedMatrixHandle(block.name, self.size, self.streets, self.names)
+
+    @classmethod
+    def attach(cls, handle):
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(name=handle.name)
+        values = memoryview(block.buf)[:handle.size * handle.size * 8].cast("d")
+        return cls(handle.streets, handle.names, values, source=block)
+
+    @classmethod
+    def load(cls, address_file, distance_file, cache_file=None):
+        digest = source_digest(address_file, distance_file)
+        if cache_file is None:
+            cache_file = os.path.join(os.path.dirname(os.path.abspath(distance_file)), ".distances.snapshot")
+        if os.path.exists(cache_file):
+            try:
+                return cls.from_snapshot(cache_file, digest)
+            except (OSError, ValueError):
+                pass  # Stale or unreadable snapshot: rebuild it from the CSV files below
+        matrix = cls.from_csv(address_file, distance_file)
+        try:
+            matrix.save_snapshot(cache_file, digest)
+        except OSError:
+            pass  # A read-only data directory only costs the parse on the next run
+        return matrix
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  ADDRESS BOOK FUNCTION                                         |
+#     | |                                 read_address_book(address_file)                                |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function reads the address book CSV file (address ID, name, street per row) and
+#     |                returns the streets and the names as lists indexed by address ID.
+#     |
+#     |   Time Complexity: O(n) for n addresses
+# '''
+def read_address_book(address_file):
+    with open(address_file) as addyCSV:
+        addressRows = [row for row in csv.reader(addyCSV) if row]
+    streets = [""] * len(addressRows)
+    names = [""] * len(addressRows)
+    for row in addressRows:
+        addressID = int(row[0])
+        names[addressID] = row[1]
+        streets[addressID] = row[2]
+    return streets, names
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  SOURCE DIGEST FUNCTION                                        |
+#     | |                             source_digest(address_file, distance_file)                         |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function returns the SHA-256 digest of the address and distance CSV files. A
+#     |                snapshot is only used when its stored digest matches, so editing either CSV file
+#     |                invalidates the snapshot automatically.
+#     |
+#     |   Time Complexity: O(n) in the size of the files
+# '''
+def source_digest(address_file, distance_file):
+    digest = hashlib.sha256()
+    for filename in (address_file, distance_file):
+        with open(filename, "rb") as source:
+            for block in iter(lambda: source.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.digest()
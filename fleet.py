@@ -0,0 +1,110 @@
+"""
+
+Description: Fleet Simulation Module for the WGUPS Parcel Service Program
+
+A discrete-event simulator that runs every truck trip of the day against a shared clock. Trips are
+loads of packages waiting at the hub; a trip leaves when its packages are ready, a truck is parked
+at the hub and a driver is free. When a truck returns, its driver becomes free again and the truck
+can be reloaded with the next trip. The number of trucks and drivers comes from configuration, so
+fleet sizes can be compared without hand-ordering the truck runs.
+
+"""
+
+# Python core libraries - Functionality
+import datetime
+import heapq
+from collections import deque, namedtuple
+
+# A load of packages waiting at the hub: the package IDs, the earliest time they can leave (e.g. 9:05
+# for packages delayed on a flight) and optionally the only truck number allowed to carry them.
+Trip = namedtuple("Trip", ["packages", "ready", "truck"])
+Trip.__new__.__defaults__ = (datetime.timedelta(0), None)
+
+# One completed trip: which truck and driver ran it, when it left and returned, its miles and packages.
+TripRecord = namedtuple("TripRecord", ["truck", "driver", "depart", "returned", "miles", "packages"])
+
+# Result of a simulated day: trucks and status logs by truck number, trip records in departure order
+# and the time the last truck returned.
+FleetResult = namedtuple("FleetResult", ["trucks", "logs", "trips", "finish"])
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                  FLEET SIMULATION FUNCTION                                     |
+    |                              Time Complexity: O(t log t + R)                                   |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This function simulates a day of deliveries with truck_count trucks and driver_count
+                 drivers. It keeps a priority queue of events ordered by simulated time: "return" when a
+                 truck gets back to the hub (its driver is released) and "wake" when a waiting trip's
+                 packages become ready. After every event it dispatches trips in the order they were
+                 given (first in, first out): the next trip leaves once it is ready, a driver is free and
+                 a truck (its required truck, if any) is parked at the hub. A dispatched truck's route is
+                 computed by the deliver callable, which advances truck.time to its return to the hub.
+
+                 deliver(truck, truck_num) is truckDeliverPackages (or a wrapper around it) and returns
+                 the trip's status logs. make_truck(truck_num) builds an empty truck at the hub. Trucks
+                 keep their miles across trips, and every trip is appended to truck.trips.
+
+    Time Complexity: O(t log t + R) where t is the number of trips and R is the routing time.
+
+'''
+
+
+def simulate_fleet(trips, deliver, make_truck, hub, truck_count=3, driver_count=2,
+                   start=datetime.timedelta(hours=8)):
+    if truck_count < 1 or driver_count < 1:
+        raise ValueError("The fleet needs at least one truck and one driver")
+    for trip in trips:
+        if trip.truck is not None and not 1 <= trip.truck <= truck_count:
+            raise ValueError(f"Trip requires truck {trip.truck}, but the fleet has {truck_count} trucks")
+
+    trucks = {truck_num: make_truck(truck_num) for truck_num in range(1, truck_count + 1)}
+    logs = {truck_num: [] for truck_num in trucks}
+    records = []
+    idleTrucks = set(trucks)
+    freeDrivers = list(range(1, driver_count + 1))
+    pending = deque(trips)
+    events = [(start, 0, "wake", None)]
+    sequence = 1
+
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if kind == "return":
+            truck_num, driver = payload
+            idleTrucks.add(truck_num)
+            heapq.heappush(freeDrivers, driver)
+
+        while pending and freeDrivers:
+            trip = pending[0]
+            if trip.ready > now:
+                heapq.heappush(events, (trip.ready, sequence, "wake", None))
+                sequence += 1
+                break
+            if trip.truck is not None:
+                truck_num = trip.truck if trip.truck in idleTrucks else None
+            else:
+                truck_num = min(idleTrucks) if idleTrucks else None
+            if truck_num is None:
+                break  # Wait for a truck to come back
+
+            pending.popleft()
+            idleTrucks.discard(truck_num)
+            driver = heapq.heappop(freeDrivers)
+
+            # Reload the truck at the hub and run the trip from the current simulated time
+            truck = trucks[truck_num]
+            truck.currentLocation = hub
+            truck.time = now
+            truck.departTime = now
+            truck.packages = list(trip.packages)
+            milesBefore = truck.miles
+            logs[truck_num].extend(deliver(truck, truck_num))
+
+            record = TripRecord(truck_num, driver, now, truck.time, truck.miles - milesBefore, list(truck.packages))
+            truck.trips.append(record)
+            records.append(record)
+            heapq.heappush(events, (truck.time, sequence, "return", (truck_num, driver)))
+            sequence += 1
+
+    finish = max((record.returned for record in records), default=start)
+    return FleetResult(trucks, logs, records, finish)
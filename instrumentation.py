@@ -0,0 +1,106 @@
+"""
+
+Description: Instrumentation Module for the WGUPS Parcel Service Program
+
+Opt-in counters and timers for the phases of truckDeliverPackages (choosing the next stop, distance
+lookups, progress records, route improvement, the delivery pass) and for rendering the status tables.
+Instrumentation is off unless an Instrumentation object is set on the delivery context
+(main.context.instrumentation); when it is off the routing loop only pays for an `is not None`
+check per phase.
+
+"""
+
+# Python core libraries - Functionality
+import csv
+import json
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                   INSTRUMENTATION CLASS                                        |
+    |                                  Time Complexity: O(1)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class accumulates, per truck number and phase name, how many operations were
+                 done and how many seconds they took. The phases recorded by truckDeliverPackages are:
+
+                   - candidates: stops evaluated by the router's next_stop calls;
+                   - lookups: distance lookups of the greedy pass;
+                   - progress: RouteStep records kept for the algorithm progress table (not headless);
+                   - improve: 2-opt / Or-opt moves applied by the improvement pass;
+                   - at_risk_check: stops checked against their deadlines before dispatch;
+                   - stops / deliveries: stops driven and packages delivered by the delivery pass;
+                   - trips: routed trips, with the total time spent in truckDeliverPackages.
+
+                 main() adds a "render" phase for the status tables it prints. When a trip has been
+                 routed, the callback (if any) is called with the truck number and that truck's summary,
+                 e.g. to stream the numbers to a monitoring system.
+    Methods:
+        1. __init__: Initializes the empty counters and the optional per-trip callback.
+        2. add: Adds operations and seconds to a truck's phase.
+        3. end_trip: Counts a routed trip and calls the callback.
+        4. summary: Returns {truck number: {phase: {"count", "seconds"}}}.
+        5. totals: Returns {phase: {"count", "seconds"}} over all trucks.
+        6. rows: Returns one (truck, phase, count, seconds, microseconds per operation) tuple per entry.
+        7. export: Writes the counters to a .csv file (one row per truck and phase) or a JSON file.
+        8. reset: Clears the counters.
+
+    Time Complexity:
+        - add / end_trip: O(1), plus the callback.
+        - summary / totals / rows / export: O(k) where k is the number of (truck, phase) entries.
+        - reset: O(1)
+
+'''
+
+
+class Instrumentation:
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._phases = {}
+
+    def add(self, truck_num, phase, count=1, seconds=0.0):
+        entry = self._phases.get((truck_num, phase))
+        if entry is None:
+            entry = self._phases[(truck_num, phase)] = [0, 0.0]
+        entry[0] += count
+        entry[1] += seconds
+
+    def end_trip(self, truck_num, seconds):
+        self.add(truck_num, "trips", 1, seconds)
+        if self.callback is not None:
+            self.callback(truck_num, self.summary().get(truck_num, {}))
+
+    def summary(self):
+        trucks = {}
+        for (truck_num, phase), (count, seconds) in self._phases.items():
+            trucks.setdefault(truck_num, {})[phase] = {"count": count, "seconds": seconds}
+        return trucks
+
+    def totals(self):
+        phases = {}
+        for (truck_num, phase), (count, seconds) in self._phases.items():
+            total = phases.setdefault(phase, {"count": 0, "seconds": 0.0})
+            total["count"] += count
+            total["seconds"] += seconds
+        return phases
+
+    def rows(self):
+        rows = []
+        entries = sorted(self._phases.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+        for (truck_num, phase), (count, seconds) in entries:
+            rows.append((truck_num, phase, count, seconds, seconds / count * 1e6 if count else 0.0))
+        return rows
+
+    def export(self, path):
+        if str(path).lower().endswith(".csv"):
+            with open(path, "w", newline="") as output:
+                writer = csv.writer(output)
+                writer.writerow(["truck", "phase", "count", "seconds", "us_per_op"])
+                for truck_num, phase, count, seconds, perOp in self.rows():
+                    writer.writerow([truck_num, phase, count, f"{seconds:.6f}", f"{perOp:.3f}"])
+        else:
+            with open(path, "w") as output:
+                json.dump({"trucks": {str(truck_num): phases for truck_num, phases in self.summary().items()},
+                           "totals": self.totals()}, output, indent=2)
+
+    def reset(self):
+        self._phases = {}
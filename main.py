@@ -17,13 +17,25 @@ cost (miles) and deliver the packages in the most efficient way based on the con
 # Python core libraries - Functionality
 import csv
 import datetime
+import os
+import sys
 import time
+from collections import namedtuple
+
+# Project modules - Routing data
+from distances import DistanceMatrix
+from providers import SparseDistanceGraph
+from routing import DeadlineRouter, NearestNeighborRouter, at_risk_stops, group_stops, improve_route, parse_deadline
+from spatial import CandidateIndex, embedding_for
+from assignment import assign_packages
+from fleet import Trip, simulate_fleet
+from instrumentation import Instrumentation
+from statuslog import StatusLogWriter, StatusRecord, format_time
+from timeline import StatusTimeline
 
 # Third-party libraries - User Interface
-from rich.console import Console
-from rich.table import Table
-from rich.table import box
-from rich.text import Text
+# The Rich library is imported inside the rendering functions, so importing this module for routing
+# (e.g. from a worker process) does not pay for loading it.
 
 '''
     ,------------------------------------------------------------------------------------------------,
@@ -33,38 +45,97 @@ from rich.text import Text
     
     Description: This class represents a hash table with chaining implementation, allowing 
                  the storage of key-value pairs. In cases of hash collisions, the colliding 
-                 items are stored in a linked list.
+                 items are stored in a linked list. Secondary indexes (attribute value -> keys) can
+                 be kept for item attributes such as street, so items can be found by that attribute
+                 without scanning every bucket.
     Methods: 
-        1. __init__: Initializes the hash table with an initial capacity.
+        1. __init__: Initializes the hash table with an initial capacity and the indexed attributes.
         2. insert: Inserts an item into the hash table.
         3. search: Searches for an item based on the key.
         4. remove: Removes an item from the hash table based on the key.
-        5. get_package_id_by_street: Searches for a package based on the street address.
+        5. reindex: Moves a key in a secondary index after the item's attribute has changed.
+        6. get_package_ids_by_street: Returns the keys of all packages with the street address.
+        7. get_package_id_by_street: Searches for a package based on the street address.
+        8. load_factor: Returns the number of items per bucket.
+        9. stats: Returns the capacity, item count, load factor, chain lengths and resize count.
+        10. items: Yields every key-value pair in the hash table.
+        11. get_keys_by: Returns the keys of all items with an attribute value (indexed or scanned).
+
+                 When an insert pushes the load factor above max_load_factor, the table doubles its
+                 number of buckets and rehashes every item, so chains stay short as the table grows.
         
     Time Complexity: 
-        - insert: O(1) average and O(n) worst case.
+        - insert: O(1) amortized and O(n) worst case (a resize rehashes all n items).
         - search: O(1) average and O(n) worst case.
         - remove: O(1) average and O(n) worst case.
-        - get_package_id_by_street: O(n) where n is the total number of items in the hash table.
+        - reindex: O(k) where k is the number of items sharing the old attribute value.
+        - get_package_ids_by_street: O(k) where k is the number of packages at the street.
+        - get_package_id_by_street: O(1) with the street index, O(n) without it.
+        - load_factor: O(1)
+        - stats: O(m) where m is the number of buckets.
+        - items: O(n + m)
+        - get_keys_by: O(k) with an index on the attribute, O(n) without it.
 
 '''
 
 
 class HashTableWChains:
-    def __init__(self, initial_capacity=40):
+    def __init__(self, initial_capacity=40, indexed_attributes=("street",), max_load_factor=1.0):
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity must be at least 1")
+        if max_load_factor <= 0:
+            raise ValueError("max_load_factor must be positive")
         self.table = []
         for i in range(initial_capacity):
             self.table.append([])
+        self.indexes = {attribute: {} for attribute in indexed_attributes}
+        self.max_load_factor = max_load_factor
+        self.count = 0
+        self.resizes = 0
+
+    def __len__(self):
+        return self.count
+
+    def _resize(self, capacity):
+        old_table = self.table
+        self.table = [[] for i in range(capacity)]
+        for bucket_list in old_table:
+            for kv in bucket_list:
+                self.table[hash(kv[0]) % capacity].append(kv)
+        self.resizes += 1
+
+    def _index_add(self, key, item):
+        for attribute, index in self.indexes.items():
+            value = getattr(item, attribute, None)
+            if value is not None:
+                index.setdefault(value, []).append(key)
+
+    def _index_remove(self, key, item, attribute=None, value=None):
+        for name, index in self.indexes.items():
+            if attribute is not None and name != attribute:
+                continue
+            old_value = value if attribute is not None else getattr(item, name, None)
+            keys = index.get(old_value)
+            if keys is not None and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del index[old_value]
 
     def insert(self, key, item):
         bucket = hash(key) % len(self.table)
         bucket_list = self.table[bucket]
         for kv in bucket_list:
             if kv[0] == key:
+                self._index_remove(key, kv[1])
                 kv[1] = item
+                self._index_add(key, item)
                 return True
         key_value = [key, item]
         bucket_list.append(key_value)
+        self._index_add(key, item)
+        self.count += 1
+        if self.count > self.max_load_factor * len(self.table):
+            self._resize(len(self.table) * 2)
         return True
 
     def search(self, key):
@@ -81,14 +152,56 @@ class HashTableWChains:
         for kv in bucket_list:
             if kv[0] == key:
                 bucket_list.remove(kv)
+                self._index_remove(key, kv[1])
+                self.count -= 1
                 return True
         return False
 
+    def reindex(self, key, attribute, old_value):
+        index = self.indexes.get(attribute)
+        item = self.search(key)
+        if index is None or item is None:
+            return False
+        self._index_remove(key, item, attribute, old_value)
+        new_value = getattr(item, attribute, None)
+        if new_value is not None:
+            index.setdefault(new_value, []).append(key)
+        return True
+
+    def load_factor(self):
+        return self.count / len(self.table)
+
+    def stats(self):
+        chains = [len(bucket_list) for bucket_list in self.table]
+        used = [chain for chain in chains if chain]
+        return {
+            "capacity": len(self.table),
+            "count": self.count,
+            "load_factor": self.load_factor(),
+            "max_load_factor": self.max_load_factor,
+            "max_chain": max(chains),
+            "mean_chain": sum(used) / len(used) if used else 0.0,
+            "empty_buckets": len(chains) - len(used),
+            "resizes": self.resizes,
+        }
+
+    def items(self):
+        for bucket_list in self.table:
+            for key, item in bucket_list:
+                yield key, item
+
+    def get_keys_by(self, attribute, value):
+        if attribute in self.indexes:
+            return list(self.indexes[attribute].get(value, ()))
+        return [key for bucket in self.table for key, item in bucket if getattr(item, attribute, None) == value]
+
+    def get_package_ids_by_street(self, street):
+        return self.get_keys_by("street", street)
+
     def get_package_id_by_street(self, street):
-        for bucket in self.table:
-            for key, package in bucket:
-                if package.street == street:
-                    return package.ID
+        packageIDs = self.get_package_ids_by_street(street)
+        if packageIDs:
+            return packageIDs[0]
         return "Hub"  # return "Hub" if no package is found aka Source
 
 
@@ -100,33 +213,63 @@ class HashTableWChains:
     
     Description: This class represents a package with various attributes such as ID, street, 
                  city, state, zip, deadline, weight, notes, status, departureTime, and deliveryTime.
+                 The attributes are stored in __slots__ and the repeated strings (street, city, state,
+                 zip, deadline, notes) are interned, so long package histories stay compact in memory.
+                 The deadline and weight are also parsed once into deadlineTime and weightValue.
     Methods: 
         1. __init__: Initializes a package object with the given attributes.
         2. __str__: Returns a string representation of the package object.
         3. statusUpdate: Updates the status of the package based on the given time change.
+        4. updateAddress: Changes the street and zip code and updates the street index.
     
     Time Complexity: 
         - __init__: O(1)
         - __str__: O(1)
         - statusUpdate: O(1)
+        - updateAddress: O(1) average
 
 '''
 
 
+# Street address of the hub every truck leaves from and returns to
+HUB = "4001 South 700 East"
+
+# Status of a package loaded from the package file, before the truck loads are simulated
+LOADED_STATUS = "At the Hub"
+
+# Time at which the corrected address for package 9 ("Wrong address listed") becomes known
+ADDRESS_CORRECTION_TIME = datetime.timedelta(hours=10, minutes=20)
+
+# Address history per package ID: (time, street, zip) entries, the first one being the listed address.
+# A corrected address applies to times after its entry's time.
+ADDRESS_HISTORY = {
+    9: [(datetime.timedelta(0), "300 State St", "84103"),
+        (ADDRESS_CORRECTION_TIME, "410 S State St", "84111")],
+}
+
+
 class Packages:
+    # Fixed attribute slots instead of a per-object __dict__ keep each package small in memory
+    __slots__ = ("deliveryTime", "departureTime", "ID", "street", "city", "state", "zip", "deadline", "weight",
+                 "notes", "status", "deadlineTime", "weightValue")
+
     def __init__(self, ID, street, city, state, zip, deadline, weight, notes, status='At Hub', departureTime=None,
                  deliveryTime=None):
         self.deliveryTime = deliveryTime
         self.departureTime = departureTime
         self.ID = ID
-        self.street = street
-        self.city = city
-        self.state = state
-        self.zip = zip
-        self.deadline = deadline
+        # Streets, cities, states, zip codes and deadlines repeat across packages, so share one copy of each
+        self.street = sys.intern(street)
+        self.city = sys.intern(city)
+        self.state = sys.intern(state)
+        self.zip = sys.intern(zip)
+        self.deadline = sys.intern(deadline)
         self.weight = weight
-        self.notes = notes
+        self.notes = sys.intern(notes)
         self.status = status
+        # Typed copies parsed once at load: deadline as a timedelta (None for EOD) and weight as a number
+        self.deadlineTime = parse_deadline(deadline)
+        self.weightValue = float(weight)
 
     def __str__(self):
         return (self.ID, self.street, self.deadline, self.weight, self.status,
@@ -141,13 +284,80 @@ class Packages:
             self.status = "En-route"
         else:
             self.status = "Delivered"
-        if self.ID == 9:
-            if timeChange > datetime.timedelta(hours=10, minutes=20):
-                self.street = "410 S State St"
-                self.zip = "84111"
-            else:
-                self.street = "300 State St"
-                self.zip = "84103"
+        history = ADDRESS_HISTORY.get(self.ID)
+        if history:
+            street, zip = history[0][1], history[0][2]
+            for changeTime, newStreet, newZip in history[1:]:
+                if timeChange > changeTime:
+                    street, zip = newStreet, newZip
+            self.updateAddress(street, zip)
+
+    def updateAddress(self, street, zip):
+        # Keep the street index of the package hash table in sync with the corrected address
+        # Interned like the constructor's strings, so repeated corrections share one copy
+        if street != self.street:
+            oldStreet = self.street
+            self.street = sys.intern(street)
+            packageHash = context._packageHash
+            if packageHash is not None and packageHash.search(self.ID) is self:
+                packageHash.reindex(self.ID, "street", oldStreet)
+        self.zip = sys.intern(zip)
+
+
+# '''
+#      | ,------------------------------------------------------------------------------------------------,
+#      | |                                PACKAGE ROW PARSING FUNCTION                                    |
+#      | |                               parsePackageRow(row, line_number)                                |
+#      | '------------------------------------------------------------------------------------------------'
+#      |   Description: This function validates one row of the package CSV file and creates a Packages object
+#      |                from it. The ID must be a positive integer, the street must not be empty, the weight
+#      |                must be a number and the deadline must be "EOD" or a clock time. Invalid rows raise a
+#      |                ValueError naming the line number.
+#      |
+#      |   Time Complexity: O(1)
+# '''
+def parsePackageRow(row, line_number):
+    if len(row) < 8:
+        raise ValueError(f"line {line_number}: expected 8 columns, got {len(row)}")
+    try:
+        pID = int(row[0])
+        if pID < 1:
+            raise ValueError("package ID must be a positive number")
+        if not row[1].strip():
+            raise ValueError("street is empty")
+        return Packages(pID, row[1], row[2], row[3], row[4], row[5], row[6], row[7], LOADED_STATUS)
+    except ValueError as e:
+        raise ValueError(f"line {line_number}: {e}") from None
+
+
+# '''
+#      | ,------------------------------------------------------------------------------------------------,
+#      | |                              STREAMING PACKAGE LOADER FUNCTION                                 |
+#      | |                            iterPackageChunks(filename, chunk_size)                             |
+#      | '------------------------------------------------------------------------------------------------'
+#      |   Description: This generator reads the package CSV file lazily and yields lists of at most chunk_size
+#      |                parsed and validated Packages objects. Only one chunk is held in memory at a time, so
+#      |                routing and truck assignment can start on the first chunks while the rest of a large
+#      |                manifest is still being read.
+#      |
+#      |   Time Complexity: O(n), O(chunk_size) memory
+# '''
+def iterPackageChunks(filename, chunk_size=1000):
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    with open(filename, newline='') as packagess:
+        packageInfo = csv.reader(packagess, delimiter=',')
+        next(packageInfo, None)
+        chunk = []
+        for package in packageInfo:
+            if not package:
+                continue
+            chunk.append(parsePackageRow(package, packageInfo.line_num))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
 
 # '''
@@ -155,46 +365,137 @@ class Packages:
 #      | |                                PACKAGE DATA LOADING FUNCTION                                   |
 #      | |                                     loadPackageData(filename)                                  |
 #      | '------------------------------------------------------------------------------------------------'
-#      |   Description: This function loads package data from a CSV file. It opens the file and reads the package
-#      |                information using the csv.reader. It skips the header row and iterates through each row of
-#      |                package data. It extracts the necessary information and creates a Packages object. It then
-#      |                inserts the package into the packageHash hash table using the package ID as the key.
+#      |   Description: This function loads package data from a CSV file. It streams the validated packages
+#      |                from iterPackageChunks and inserts each package into the given hash table (the
+#      |                context's packageHash by default) using the package ID as the key.
 #      |
 #      |   Time Complexity: O(n)
 # '''
 
 
-def loadPackageData(filename):
-    with open(filename) as packagess:
-        packageInfo = csv.reader(packagess, delimiter=',')
-        next(packageInfo)
-        for package in packageInfo:
-            pID = int(package[0])
-            pStreet = package[1]
-            pCity = package[2]
-            pState = package[3]
-            pZip = package[4]
-            pDeadline = package[5]
-            pWeight = package[6]
-            pNotes = package[7]
-            pStatus = "At the Hub"
-            p = Packages(pID, pStreet, pCity, pState, pZip, pDeadline, pWeight, pNotes, pStatus)
-            packageHash.insert(pID, p)
-
-
-# Initialize HashTable
-packageHash = HashTableWChains()
-
-# Load CSV data
-with open("addressCSV.csv") as addyCSV:
-    AddressCSV = csv.reader(addyCSV)
-    AddressCSV = list(AddressCSV)
-with open("distanceCSV.csv") as disCSV:
-    DistanceCSV = csv.reader(disCSV)
-    DistanceCSV = list(DistanceCSV)
-
-# Load package data
-loadPackageData('packageCSV.csv')
+def loadPackageData(filename, chunk_size=1000, table=None):
+    if table is None:
+        table = context.packageHash
+    for chunk in iterPackageChunks(filename, chunk_size):
+        for p in chunk:
+            table.insert(p.ID, p)
+    return table
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                    DELIVERY CONTEXT CLASS                                      |
+    |                                     Time Complexity: O(1)                                      |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class holds the data the program works on: the distance matrix (address book and
+                 distance table) and the package hash table. Nothing is read when the module is imported;
+                 each data set is loaded from its CSV file the first time it is used and then kept, so
+                 one process can route many manifests against a single parsed distance matrix. The
+                 distances come from a dense DistanceMatrix by default, or from a SparseDistanceGraph of
+                 the `neighbors` nearest addresses with provider="sparse" (pairs it does not connect are
+                 answered by the `fallback` provider; without one, routing to them raises ValueError). Any other DistanceProvider
+                 (such as providers.CoordinateDistances) can be passed in already loaded.
+    Methods:
+        1. __init__: Stores the CSV file names without reading them, or an already loaded distance provider.
+        2. distanceMatrix: Returns the distance provider, loading it on first use (the dense matrix from
+                           the binary snapshot when it matches the CSV files, see DistanceMatrix.load).
+        3. packageHash: Returns the package hash table, loading the package file on first use.
+        4. candidateEmbedding: Returns the spatial.Embedding of the addresses used to prune the
+                               nearest-neighbor search, built from the distances on first use.
+        5. loadManifest: Replaces the packages with a new manifest, keeping the distance matrix.
+        6. useManifest: Replaces the packages with an already loaded package hash table.
+        7. reset: Drops the loaded data so the next use reads the files again.
+
+    Time Complexity:
+        - distanceMatrix: O(n^2) on first use, O(1) afterwards.
+        - candidateEmbedding: O(n m) row lookups for m landmarks on first use (see spatial.py).
+        - packageHash: O(p) on first use, O(1) afterwards.
+        - loadManifest: O(p) where p is the number of packages.
+        - useManifest: O(1)
+        - reset: O(1)
+
+'''
+
+# Directory of this file, so the default CSV files are found regardless of the working directory
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Package attributes the context's hash table keeps secondary indexes for (street and deadline lookups)
+PACKAGE_INDEXES = ("street", "deadline")
+
+
+class DeliveryContext:
+    def __init__(self, address_file=None, distance_file=None, package_file=None, use_cache=True, cache_file=None,
+                 distance_matrix=None, provider="dense", neighbors=8, fallback=None):
+        if provider not in ("dense", "sparse"):
+            raise ValueError(f"Unknown distance provider {provider!r}; use 'dense' or 'sparse'")
+        self.address_file = address_file or os.path.join(DATA_DIR, "addressCSV.csv")
+        self.distance_file = distance_file or os.path.join(DATA_DIR, "distanceCSV.csv")
+        self.package_file = package_file or os.path.join(DATA_DIR, "packageCSV.csv")
+        self.use_cache = use_cache
+        self.cache_file = cache_file
+        self.provider = provider
+        self.neighbors = neighbors
+        # Distance provider answering the pairs a sparse graph does not connect (unreachable when None)
+        self.fallback = fallback
+        # An already loaded matrix (e.g. attached to shared memory by a worker process) is used as is
+        self._distanceMatrix = distance_matrix
+        self._packageHash = None
+        self._candidateEmbedding = None
+        # Optional instrumentation.Instrumentation collecting routing counters and timers (off when None)
+        self.instrumentation = None
+
+    @property
+    def distanceMatrix(self):
+        if self._distanceMatrix is None:
+            if self.provider == "sparse":
+                self._distanceMatrix = SparseDistanceGraph.from_csv(self.address_file, self.distance_file,
+                                                                    k=self.neighbors, fallback=self.fallback)
+            elif self.use_cache:
+                self._distanceMatrix = DistanceMatrix.load(self.address_file, self.distance_file, self.cache_file)
+            else:
+                self._distanceMatrix = DistanceMatrix.from_csv(self.address_file, self.distance_file)
+        return self._distanceMatrix
+
+    @property
+    def packageHash(self):
+        if self._packageHash is None:
+            self._packageHash = loadPackageData(self.package_file,
+                                                table=HashTableWChains(indexed_attributes=PACKAGE_INDEXES))
+        return self._packageHash
+
+    @property
+    def candidateEmbedding(self):
+        if self._candidateEmbedding is None:
+            self._candidateEmbedding = embedding_for(self.distanceMatrix)
+        return self._candidateEmbedding
+
+    def loadManifest(self, package_file, chunk_size=1000):
+        self.package_file = package_file
+        self._packageHash = loadPackageData(package_file, chunk_size,
+                                            table=HashTableWChains(indexed_attributes=PACKAGE_INDEXES))
+        return self._packageHash
+
+    def useManifest(self, packageHash, package_file=None):
+        self.package_file = package_file or self.package_file
+        self._packageHash = packageHash
+        return packageHash
+
+    def reset(self):
+        self._distanceMatrix = None
+        self._packageHash = None
+        self._candidateEmbedding = None
+
+
+# Shared context used by the functions below; data is loaded on first use
+context = DeliveryContext()
+
+
+# Keep `main.packageHash` and `main.distanceMatrix` working for callers, resolved lazily from the context
+def __getattr__(name):
+    if name in ("packageHash", "distanceMatrix"):
+        return getattr(context, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 '''
         ,------------------------------------------------------------------------------------------------,
@@ -218,6 +519,15 @@ class Trucks:
         self.time = departTime
         self.departTime = departTime
         self.packages = packages
+        self.improvement = None
+        self.trips = []
+        self.atRisk = []
+        self.progress = []
+
+
+# One decision of the greedy pass: the street the truck is at, the package IDs it considered, the street
+# it chose, the distance to it and the planned mileage after it. create_progress_table renders these.
+RouteStep = namedtuple("RouteStep", ["street", "candidates", "chosen_street", "chosen_cost", "total_cost"])
 
 
 # '''
@@ -225,16 +535,14 @@ class Trucks:
 #     | |                                       ADDRESS SEARCH FUNCTION                                  |
 #     | |                                         address(addresses)                                     |
 #     | '------------------------------------------------------------------------------------------------'
-#     |   Description: This function searches for an address in the addressCSV list. It iterates through each row
-#     |                of the list and checks if the address is present in the third column. If found, it returns
-#     |                the corresponding address ID.
+#     |   Description: This function looks up an address in the street index of the distance matrix and
+#     |                returns the corresponding address ID. Streets that are not an exact match fall back to
+#     |                the original substring search over the address book.
 #     |
-#     |   Time Complexity: O(n)
+#     |   Time Complexity: O(1) average
 # '''
 def address(addresses):
-    for row in AddressCSV:
-        if addresses in row[2]:
-            return int(row[0])
+    return context.distanceMatrix.index_of(addresses)
 
 
 # '''
@@ -242,18 +550,15 @@ def address(addresses):
 #     | |                                   DISTANCE BETWEEN ADDRESSES FUNCTION                          |
 #     | |                                       Betweenst(addy1, addy2)                                  |
 #     | '------------------------------------------------------------------------------------------------'
-#     |   Description: This function calculates the distance between two addresses based on the address IDs. It
-#     |                retrieves the distance from the distanceCSV list using the address IDs as indices. If the
-#     |                distance is empty, it retrieves the distance from the reverse direction. It returns the
-#     |                distance as a float.
+#     |   Description: This function returns the distance between two addresses based on the address IDs, from
+#     |                the context's distance provider. For the dense distance matrix (the default) this is
+#     |                a single array lookup; the sparse and coordinate providers compute it or take it
+#     |                from their caches.
 #     |
-#     |   Time Complexity: O(1)
+#     |   Time Complexity: O(1) for the dense matrix
 # '''
 def betweenst(addy1, addy2):
-    distance = DistanceCSV[addy1][addy2]
-    if distance == '':
-        distance = DistanceCSV[addy2][addy1]
-    return float(distance)
+    return context.distanceMatrix.distance(addy1, addy2)
 
 
 '''
@@ -266,24 +571,50 @@ def betweenst(addy1, addy2):
                     truck number as input. It initializes an empty list for en_route packages and an
                     empty list for status logs. It adds the packages from the truck object to the en_route
                     list. It then enters a loop until all packages are delivered. In each iteration, it
-                    finds the next package to deliver based on the current location and the distance to
-                    each package's street address. It updates the status logs and truck attributes
+                    finds the next stop to visit based on the current location and the distance to
+                    each stop's street address. Packages that share an address are grouped into one stop
+                    and are all delivered during that visit. It updates the status logs and truck attributes
                     accordingly. Once all packages are delivered, it calculates the distance to return to
                     the hub and updates the status logs and truck attributes. It returns the status logs.
+
+                    When deadline_aware is True, the stops are chosen by routing.DeadlineRouter (distance
+                    plus a penalty for little deadline slack, with a feasibility check) instead of the
+                    fixed priority for packages 25 and 6. Before the truck drives, the planned order is
+                    checked and packages at risk of missing their deadline are added to truck.atRisk.
+
+                    The status logs are statuslog.StatusRecord tuples with numeric time (seconds since
+                    midnight) and mileage fields, and every greedy decision is appended to truck.progress
+                    as a RouteStep; create_progress_table renders them as the algorithm progress table on
+                    request. With headless=True the progress records are not built, which is all a batch
+                    run needs.
+
+                    When context.instrumentation is set, the time spent and the operations done in each
+                    phase (candidate evaluations, lookups, table rows, improvement, at-risk check and
+                    delivery pass) are added to it per truck (see instrumentation.Instrumentation).
+
+                    When improve is True, the greedy visit order is post-processed with 2-opt / Or-opt
+                    local search (see routing.improve_route) for at most time_budget seconds before the
+                    truck drives it. Deadlines and the package 9 address correction are never made worse,
+                    and the mileage before / after is stored in truck.improvement.
+
+                    When prune is True and the route has at least PRUNING_MIN_STOPS stops, the nearest-
+                    neighbor search uses a spatial.CandidateIndex over the context's candidate embedding,
+                    so each step evaluates the distances of the nearby stops only; the visit order is the
+                    same as without it. The deadline-aware router always scans every stop.
+
+                    The truck returns to depot (the street of its hub, HUB by default) at the end of the trip.
     
       Time Complexity: O(n^2)
 '''
 
 
-def truckDeliverPackages(truck, truck_num):
-    # Initialize a table for logging status of algorithms
-    table = Table(title="\n[bold][yellow]Algorithm Progress for Truck #" + str(truck_num) + "[/yellow][/bold]",
-                  show_header=True, header_style="bold rgb(255,165,0)", box=box.MINIMAL_DOUBLE_HEAD)
-    table.add_column("Current Node", justify="right")
-    table.add_column("Candidates", justify="right")
-    table.add_column("Chosen Node", justify="right")
-    table.add_column("Chosen Cost", justify="right")
-    table.add_column("Total Cost", justify="right")
+def truckDeliverPackages(truck, truck_num, improve=False, time_budget=0.05, deadline_aware=False, headless=False,
+                         prune=False, depot=HUB):
+    packageHash = context.packageHash
+    distanceMatrix = context.distanceMatrix
+    probe = context.instrumentation
+    if probe is not None:
+        tripStarted = time.perf_counter()
 
     en_route = []
     status_logs = []
@@ -293,88 +624,144 @@ def truckDeliverPackages(truck, truck_num):
         en_route.append(package)
     truck.packages.clear()
 
-    while len(en_route) > 0:
-        nextAddy = 2000
-        nextPackage = None
-        candidates = []
-
-        # Log the state of en route before the for loop
-        # en_route_ids = ", ".join(str(package.ID) for package in en_route)
-
-        # Uncomment to print the status check in the console - Algorithm Analysis
-        # console.print(f"\n[yellow]En route before loop:[/yellow] {en_route_ids}")
-
-        for package in en_route:
-            # Log the state of the package being considered
-            # considering_ids = ", ".join(str(package.ID) for package in en_route)
-
-            # Uncomment to print the status check in the console - Algorithm Analysis
-            # console.print(f"[green]Considering package:[/green] {considering_ids}")
-
-            # Uncomment to view the package street in addition to its ID
-            # console.print(f"\n[green]Considering package:[/green] {package.ID} at [white]{package.street}[/white]")
-
-            candidates.append(package.ID)
-
-            # Log the state of candidates after appending
-            # candidates_ids = ", ".join(str(candidate) for candidate in candidates)
-
-            # Uncomment to print the status check in the console - Algorithm Analysis
-            # console.print(f"[orange]Candidates after appending:[/orange] {candidates_ids}")
-
-            if package.ID in [25, 6]:
-                nextPackage = package
-                nextAddy = betweenst(address(truck.currentLocation), address(package.street))
-                break
-
-            if betweenst(address(truck.currentLocation), address(package.street)) <= nextAddy:
-                nextAddy = betweenst(address(truck.currentLocation), address(package.street))
-                nextPackage = package
-
-        # Initialize table parameters for each decision
-        # current_node = truck.currentLocation
-        candidates_ids = ", ".join(str(candidate) for candidate in candidates)
-        current_package_id = packageHash.get_package_id_by_street(truck.currentLocation)
-        chosen_node = nextPackage.street if nextPackage else "N/A"
-        chosen_package_id = packageHash.get_package_id_by_street(chosen_node) if nextPackage else "N/A"
-        chosen_cost = nextAddy
-        total_cost = truck.miles + chosen_cost
+    # Packages sharing an address are delivered in one visit, so the route is built over unique stops
+    stops = group_stops(en_route, address)
+
+    # Time windows per stop in hours: the earliest package deadline, and the address correction time for
+    # a wrong address
+    departHours = truck.time.total_seconds() / 3600
+    deadlines = []
+    earliest = []
+    for stop in stops:
+        stopDeadlines = [package.deadlineTime.total_seconds() / 3600 for package in stop.packages
+                         if package.deadlineTime is not None]
+        deadlines.append(min(stopDeadlines) if stopDeadlines else None)
+        if any("wrong address" in package.notes.lower() for package in stop.packages):
+            earliest.append(ADDRESS_CORRECTION_TIME.total_seconds() / 3600)
+        else:
+            earliest.append(None)
 
-        table.add_row(
-            Text(str(current_package_id), style="black on yellow", justify="center"),
-            Text(str(candidates_ids), style="bold green", justify="left"),
-            Text(str(chosen_package_id), style="black on green", justify="center"),
-            Text(str(round(chosen_cost, 2)), style="bold red"),
-            Text(str(round(total_cost, 2)), style="bold red")
-        )
+    if deadline_aware:
+        # Rank stops by distance plus deadline slack instead of a fixed priority list
+        router = DeadlineRouter(distanceMatrix, [stop.address for stop in stops], address(truck.currentLocation),
+                                deadlines=deadlines, earliest=earliest, depart=departHours, speed=truck.speed)
+    else:
+        # Packages 25 and 6 have early deadlines and their stops are always visited first. Long routes
+        # can search the stops near the truck first instead of every remaining stop.
+        addresses = [stop.address for stop in stops]
+        index = None
+        if prune and len(addresses) >= PRUNING_MIN_STOPS:
+            index = CandidateIndex(context.candidateEmbedding, addresses)
+        router = NearestNeighborRouter(distanceMatrix, addresses,
+                                       priority=[i for i, stop in enumerate(stops)
+                                                 if any(package.ID in [25, 6] for package in stop.packages)],
+                                       index=index)
+    hubAddy = address(depot)
+    currentAddy = address(truck.currentLocation)
+    currentStreet = truck.currentLocation
+    plannedMiles = truck.miles
+    order = []
+
+    # Decisions of the greedy pass, rendered on request by create_progress_table (skipped when headless)
+    progress = None if headless else truck.progress
+
+    # Greedy pass: choose the visit order with the Nearest Neighbor Algorithm
+    while router.remaining > 0:
+        if probe is not None:
+            started = time.perf_counter()
+            evaluated = router.evaluated
+        position = router.next_stop(currentAddy)
+        if probe is not None:
+            probe.add(truck_num, "candidates", router.evaluated - evaluated, time.perf_counter() - started)
+            started = time.perf_counter()
+        nextStop = stops[position]
+        chosen_cost = betweenst(currentAddy, nextStop.address)
+        if probe is not None:
+            probe.add(truck_num, "lookups", 1, time.perf_counter() - started)
+
+        if progress is not None:
+            if probe is not None:
+                started = time.perf_counter()
+            # Candidates considered in this step (a priority stop cuts the search short)
+            pending = router.pending()
+            if position in router.priority:
+                pending = pending[:pending.index(position) + 1]
+            candidates = tuple(package.ID for i in pending for package in stops[i].packages)
+            progress.append(RouteStep(currentStreet, candidates, nextStop.street, chosen_cost,
+                                      plannedMiles + chosen_cost))
+            if probe is not None:
+                probe.add(truck_num, "progress", 1, time.perf_counter() - started)
+
+        order.append(position)
+        router.visit(position)
+        plannedMiles += chosen_cost
+        currentAddy = nextStop.address
+        currentStreet = nextStop.street
+
+    # Optional local search pass: 2-opt / Or-opt without breaking deadlines or the address correction
+    if improve:
+        if probe is not None:
+            started = time.perf_counter()
+        truck.improvement = improve_route(distanceMatrix, address(truck.currentLocation), hubAddy, router.stops,
+                                          order, fixed=len(router.priority), depart=departHours,
+                                          speed=truck.speed, deadlines=deadlines, earliest=earliest,
+                                          time_budget=time_budget)
+        order = truck.improvement.order
+        if probe is not None:
+            probe.add(truck_num, "improve", truck.improvement.moves, time.perf_counter() - started)
+
+    # Check the planned order before dispatch: packages at stops reached within AT_RISK_MARGIN of their
+    # deadline (or before their address is corrected) are flagged on the truck
+    if probe is not None:
+        started = time.perf_counter()
+    for position in at_risk_stops(distanceMatrix, address(truck.currentLocation), router.stops, order,
+                                  depart=departHours, speed=truck.speed, deadlines=deadlines, earliest=earliest,
+                                  margin=AT_RISK_MARGIN.total_seconds() / 3600):
+        truck.atRisk.extend(package.ID for package in stops[position].packages
+                            if package.deadlineTime is not None or earliest[position] is not None)
+    if probe is not None:
+        probe.add(truck_num, "at_risk_check", len(order), time.perf_counter() - started)
+        started = time.perf_counter()
+
+    # Delivery pass: drive the chosen order, stopping once per address and delivering all of its packages
+    currentAddy = address(truck.currentLocation)
+    for position in order:
+        nextStop = stops[position]
+        nextAddy = betweenst(currentAddy, nextStop.address)
 
         # Indicates when the truck has stopped at the delivery location.
-        statusStops = (
-            f"{truck_num},stopped,{truck.time},{truck.miles:.1f},{nextPackage.street}")
-        status_logs.append(statusStops)
+        status_logs.append(StatusRecord(truck_num, "stopped", truck.time.total_seconds(), truck.miles,
+                                        nextStop.street, None))
 
-        truck.packages.append(nextPackage.ID)
-        en_route.remove(nextPackage)
         truck.miles += nextAddy
-        truck.currentLocation = nextPackage.street
+        truck.currentLocation = nextStop.street
+        currentAddy = nextStop.address
         truck.time += datetime.timedelta(hours=nextAddy / 18)
-        nextPackage.deliveryTime = truck.time
-        nextPackage.departureTime = truck.departTime
 
-        # Indicates that the package has been delivered
-        statusDelivered = f"{truck_num},delivered,{truck.time} , ,Package {nextPackage.ID}"
-        status_logs.append(statusDelivered)
+        for nextPackage in nextStop.packages:
+            truck.packages.append(nextPackage.ID)
+            nextPackage.deliveryTime = truck.time
+            nextPackage.departureTime = truck.departTime
+
+            # Indicates that the package has been delivered
+            status_logs.append(StatusRecord(truck_num, "delivered", truck.time.total_seconds(), truck.miles, None,
+                                            nextPackage.ID))
 
-    return_distance = betweenst(address(truck.currentLocation), address("4001 South 700 East"))
+    return_distance = betweenst(currentAddy, hubAddy)
     truck.miles += return_distance
     truck.time += datetime.timedelta(hours=return_distance / 18)
 
     # Indicates when the truck has arrived at the hub
-    statusHub = f"{truck_num},return,{truck.time},{truck.miles:.1f},4001 South 700 East (hub)"
-    status_logs.append(statusHub)
+    status_logs.append(StatusRecord(truck_num, "return", truck.time.total_seconds(), truck.miles, depot, None))
+
+    if probe is not None:
+        deliverySeconds = time.perf_counter() - started
+        probe.add(truck_num, "stops", len(order), deliverySeconds)
+        probe.add(truck_num, "deliveries", len(truck.packages))
+        probe.end_trip(truck_num, time.perf_counter() - tripStarted)
 
-    # Uncomment to print the status check in the console - Algorithm Analysis
-    # console.print(table)
+    # Print the decisions of the greedy pass in the console - Algorithm Analysis
+    # console.print(create_progress_table(truck.progress, truck_num))
 
     return status_logs
 
@@ -390,6 +777,46 @@ def truckDeliverPackages(truck, truck_num):
 BOLDORANGE = "\x1b[1;31m\033[38;2;243;134;48m"
 RESET = "\033[0m"
 
+# Set to True to run the 2-opt / Or-opt route improvement pass after the greedy pass
+IMPROVE_ROUTES = False
+
+# Set to True to choose stops by deadline slack (routing.DeadlineRouter) instead of the fixed priority list
+DEADLINE_ROUTING = False
+
+# Set to True to let the nearest-neighbor search of routes with at least PRUNING_MIN_STOPS stops look at
+# nearby stops first (spatial.CandidateIndex); the routes are the same, with fewer distance evaluations
+CANDIDATE_PRUNING = False
+PRUNING_MIN_STOPS = 64
+
+# Packages planned to arrive less than this long before their deadline are reported as at risk
+AT_RISK_MARGIN = datetime.timedelta(minutes=15)
+
+# Set to a .json or .csv file name to record routing counters and timers (instrumentation.Instrumentation)
+INSTRUMENTATION_FILE = None
+
+# Seconds to pause between the printed truck tables, so the console output can be followed
+DISPLAY_PAUSE = 0.5
+
+# Set to a .csv or .jsonl file name to stream the status log records of every trip to it
+STATUS_LOG_FILE = None
+
+# Fleet configuration: trucks and drivers available, the start of the day, and the truck loads in the
+# order they are dispatched. A load leaves once it is ready and a truck and a driver are at the hub.
+TRUCK_COUNT = 3
+DRIVER_COUNT = 2
+DAY_START = datetime.timedelta(hours=8)
+RUN_DATE = datetime.date(2023, 9, 25)
+TRUCK_TRIPS = [
+    Trip([1, 29, 7, 30, 8, 34, 40, 13, 39, 14, 15, 16, 19, 20, 37], DAY_START, 1),
+    Trip([17, 12, 25, 28, 32, 3, 18, 36, 38, 27, 35, 2, 33, 9], datetime.timedelta(hours=9, minutes=5), 3),
+    Trip([6, 5, 21, 4, 24, 23, 26, 22, 10, 11, 31], datetime.timedelta(hours=9, minutes=5), 2),
+]
+
+# Set to True to build the truck loads from the package notes (assignment.assign_packages) instead of
+# using TRUCK_TRIPS
+AUTO_ASSIGN = False
+TRUCK_CAPACITY = 16
+
 
     # '''
     #     | ,------------------------------------------------------------------------------------------------,
@@ -406,6 +833,10 @@ RESET = "\033[0m"
     # '''
 
 def create_and_print_parameter_table(package, param_choice):
+    from rich.console import Console
+    from rich.table import Table, box
+    from rich.text import Text
+
     # Create a Console object
     console = Console(color_system="256")
     param_dict = {'a': 'street', 'b': 'city', 'c': 'zip', 'd': 'state', 'e': 'deadline', 'f': 'weight', 'g': 'status',
@@ -472,6 +903,8 @@ def create_and_print_parameter_table(package, param_choice):
 
 
 def create_and_print_table(status_logs):
+    from rich.table import Table, box
+
     # Create a Table object and define its columns
     table = Table(show_header=True, header_style="bold rgb(255,165,0)", box=box.ROUNDED)
     table.add_column("Truck", style="bold rgb(255,255,255)", justify="center", width=12)
@@ -480,29 +913,69 @@ def create_and_print_table(status_logs):
     table.add_column("Miles", style="bold rgb(224,224,224)", width=18)
     table.add_column("Address or Package #", style="bold", width=33)
 
-    # Parse each log and add it as a row to the table
-    for log in status_logs:
-        parts = log.split(",")
-
-        # Extracting truck number, status, time, and miles
-        truck_num = parts[0]
-        status = parts[1]
-        log_time = parts[2]
-        miles = parts[3]
-
-        # Extracting address or package number
-        address_or_package = parts[4]
+    # Add each status record as a row to the table
+    for record in status_logs:
+        log_time = format_time(record.time)
 
-        # Apply coloring based on the status
-        if status.lower() == "delivered":
+        # Apply coloring based on the status; deliveries show the package instead of the mileage and address
+        if record.event == "delivered":
             status = "[green]Delivered[/green]"
-        elif status.lower() == "stopped":
+            miles = ""
+            address_or_package = f"Package {record.package}"
+        elif record.event == "stopped":
             status = "[yellow]Stopped[/yellow]"
-        elif status.lower() == "return":
+            miles = f"{record.miles:.1f}"
+            address_or_package = record.street
+        else:
             status = "[red]Return[/red]"
+            miles = f"{record.miles:.1f}"
+            address_or_package = f"{record.street} (hub)"
 
-        # Adding the extracted values as a new row to the table
-        table.add_row(truck_num, status, log_time, miles, address_or_package)
+        # Adding the values as a new row to the table
+        table.add_row(str(record.truck), status, log_time, miles, address_or_package)
+
+    # Return the table to be printed later
+    return table
+
+    # '''
+    #     | ,------------------------------------------------------------------------------------------------,
+    #     | |                                  PROGRESS TABLE FUNCTION                                       |
+    #     | |                               create_progress_table(steps, truck_num)                          |
+    #     | '------------------------------------------------------------------------------------------------'
+    #     |   Description: This function creates the algorithm progress table of a truck from the RouteStep
+    #     |                records of its greedy pass (truck.progress): the package at the current node, the
+    #     |                candidates, the chosen package, and the chosen and total cost of every step. The
+    #     |                package IDs of the current and chosen streets are looked up when the table is
+    #     |                built, not while routing.
+    #     |
+    #     |   Time Complexity: O(n * k) for n steps with k candidates each
+    # '''
+
+
+def create_progress_table(steps, truck_num):
+    from rich.table import Table, box
+    from rich.text import Text
+
+    packageHash = context.packageHash
+    table = Table(title="\n[bold][yellow]Algorithm Progress for Truck #" + str(truck_num) + "[/yellow][/bold]",
+                  show_header=True, header_style="bold rgb(255,165,0)", box=box.MINIMAL_DOUBLE_HEAD)
+    table.add_column("Current Node", justify="right")
+    table.add_column("Candidates", justify="right")
+    table.add_column("Chosen Node", justify="right")
+    table.add_column("Chosen Cost", justify="right")
+    table.add_column("Total Cost", justify="right")
+
+    for step in steps:
+        candidates_ids = ", ".join(str(candidate) for candidate in step.candidates)
+        current_package_id = packageHash.get_package_id_by_street(step.street)
+        chosen_package_id = packageHash.get_package_id_by_street(step.chosen_street)
+        table.add_row(
+            Text(str(current_package_id), style="black on yellow", justify="center"),
+            Text(str(candidates_ids), style="bold green", justify="left"),
+            Text(str(chosen_package_id), style="black on green", justify="center"),
+            Text(str(round(step.chosen_cost, 2)), style="bold red"),
+            Text(str(round(step.total_cost, 2)), style="bold red")
+        )
 
     # Return the table to be printed later
     return table
@@ -513,19 +986,39 @@ def create_and_print_table(status_logs):
     #     | |                             create_and_print_package_table(package)                            |
     #     | '------------------------------------------------------------------------------------------------'
     #     |   Description: This function creates and prints a table with the details of a package. It takes a
-    #     |                package object as input. It creates a table with appropriate columns and adds the
-    #     |                package details as a row to the table. It then prints the table.
+    #     |                package object as input and prints it with create_and_print_packages_table.
     #     |
     #     |   Time Complexity: O(1)
     # '''
 
 
 def create_and_print_package_table(package):
+    create_and_print_packages_table([package])
+
+    # '''
+    #     | ,------------------------------------------------------------------------------------------------,
+    #     | |                              PACKAGES SNAPSHOT TABLE FUNCTION                                  |
+    #     | |                         create_and_print_packages_table(packages, title)                       |
+    #     | '------------------------------------------------------------------------------------------------'
+    #     |   Description: This function creates and prints one table with the details of several packages, e.g.
+    #     |                every package at a given time from StatusTimeline.all_at. It takes a list of package
+    #     |                objects (or PackageStatus views) and an optional title, adds one row per package to a
+    #     |                single table and prints it with a single Console.
+    #     |
+    #     |   Time Complexity: O(n)
+    # '''
+
+
+def create_and_print_packages_table(packages, title=None):
+    from rich.console import Console
+    from rich.table import Table, box
+    from rich.text import Text
+
     # Create a Console object
     console = Console(color_system="256")
 
     # Create a Table object and define its columns
-    table = Table(show_header=True, header_style="bold rgb(255,165,0)", box=box.ROUNDED)
+    table = Table(title=title, show_header=True, header_style="bold rgb(255,165,0)", box=box.ROUNDED)
     table.add_column("ID", style="bold rgb(255,165,0)", width=8)
     table.add_column("Street", style="dim", width=20)
     table.add_column("Deadline", style="dim", width=15)
@@ -534,18 +1027,19 @@ def create_and_print_package_table(package):
     table.add_column("Departed", style="dim", width=15)
     table.add_column("Delivered", style="bold yellow", width=15)
 
-    # Adding status with style
-    status = package.status
-    if status.lower() == "delivered":
-        status_text = Text(status, style="bold green")
-    elif status.lower() == "hub":  # Explicit condition for 'Hub' status
-        status_text = Text(status, style="bold red")
-    else:  # Adjust as needed for other statuses
-        status_text = Text(status, style="yellow")
+    for package in packages:
+        # Adding status with style
+        status = package.status
+        if status.lower() == "delivered":
+            status_text = Text(status, style="bold green")
+        elif status.lower() == "hub":  # Explicit condition for 'Hub' status
+            status_text = Text(status, style="bold red")
+        else:  # Adjust as needed for other statuses
+            status_text = Text(status, style="yellow")
 
-    # Adding a row to the table with the package details
-    table.add_row(str(package.ID), package.street, package.deadline, package.weight, status_text,
-                  str(package.departureTime), str(package.deliveryTime))
+        # Adding a row to the table with the package details
+        table.add_row(str(package.ID), package.street, package.deadline, package.weight, status_text,
+                      str(package.departureTime), str(package.deliveryTime))
 
     # Print the table
     console.print(table)
@@ -563,15 +1057,21 @@ def create_and_print_package_table(package):
     # '''
 
 
-def log_truck_metrics_with_date(truck, truck_num):
+def log_truck_metrics_with_date(truck, truck_num, run_date=None):
     # Calculate the drive time in hours
     drive_time = truck.time.total_seconds() / 3600 - truck.departTime.total_seconds() / 3600  # 1 hour = 3600 seconds
+    departTime = truck.departTime
+
+    # A truck reloaded at the hub reports its first departure and the driving time of all of its trips
+    if truck.trips:
+        drive_time = sum((trip.returned - trip.depart).total_seconds() for trip in truck.trips) / 3600
+        departTime = truck.trips[0].depart
 
-    # Use a recent date as the base date for Departure and Return Time
-    base_date = datetime.datetime(2023, 9, 25).date()  # Replace with the actual recent date you want to use
+    # The date of the simulated day is the base date for Departure and Return Time
+    base_date = run_date or RUN_DATE
 
     # Add the base date to the departure and return time and format them to include date and time information
-    departure_datetime = datetime.datetime.combine(base_date, datetime.datetime.min.time()) + truck.departTime
+    departure_datetime = datetime.datetime.combine(base_date, datetime.datetime.min.time()) + departTime
     return_datetime = datetime.datetime.combine(base_date, datetime.datetime.min.time()) + truck.time
     departure_time_str = departure_datetime.strftime('%Y-%m-%d %H:%M:%S')
     return_time_str = return_datetime.strftime('%Y-%m-%d %H:%M:%S')
@@ -586,6 +1086,18 @@ def log_truck_metrics_with_date(truck, truck_num):
         f"Total Distance: {truck.miles:.1f} miles\n"
     )
 
+    # Add the route improvement results if the local search pass was used
+    if truck.improvement is not None:
+        metrics_str += (
+            f"Greedy Distance: {truck.improvement.miles_before:.1f} miles\n"
+            f"Improved Distance: {truck.improvement.miles_after:.1f} miles "
+            f"({truck.improvement.moves} moves)\n"
+        )
+
+    # Report the packages flagged before dispatch as likely to miss their deadline
+    if truck.atRisk:
+        metrics_str += f"At-Risk Packages: {', '.join(str(packageID) for packageID in truck.atRisk)}\n"
+
     return metrics_str
 
 
@@ -604,6 +1116,9 @@ def log_truck_metrics_with_date(truck, truck_num):
 
 
 def print_total_metrics(total_distance, total_time_corrected, total_packages_delivered):
+    from rich.console import Console
+    from rich.table import Table, box
+
     # Create console and table objects
     console = Console(color_system="256")
 
@@ -622,6 +1137,61 @@ def print_total_metrics(total_distance, total_time_corrected, total_packages_del
     console.print(table)
 
 
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  DAY SIMULATION FUNCTION                                       |
+#     | |              simulate_day(headless, trips, depot, truck_count, driver_count, start)            |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function runs the configured day against the shared context: it builds the truck
+#     |                loads (TRUCK_TRIPS, or assign_packages with AUTO_ASSIGN), simulates the fleet with
+#     |                TRUCK_COUNT trucks and DRIVER_COUNT drivers from DAY_START, streams the status records
+#     |                to STATUS_LOG_FILE and exports the counters to INSTRUMENTATION_FILE when those are set.
+#     |                It returns the FleetResult. main() and the query server both start from it. The trips,
+#     |                the depot street (HUB) and the fleet settings can be given instead, as runs.py does
+#     |                for every day and depot it replays.
+#     |
+#     |   Time Complexity: O(R) where R is the routing time of all trips
+# '''
+def simulate_day(headless=False, trips=None, depot=HUB, truck_count=None, driver_count=None, start=None):
+    packageHash = context.packageHash
+    start = start if start is not None else DAY_START
+
+    if INSTRUMENTATION_FILE:
+        context.instrumentation = Instrumentation()
+
+    statusWriter = StatusLogWriter(STATUS_LOG_FILE) if STATUS_LOG_FILE else None
+
+    def deliver(truck, truck_num):
+        records = truckDeliverPackages(truck, truck_num, improve=IMPROVE_ROUTES, deadline_aware=DEADLINE_ROUTING,
+                                       headless=headless, prune=CANDIDATE_PRUNING, depot=depot)
+        if statusWriter is not None:
+            statusWriter.write_all(records)
+        return records
+
+    def make_truck(truck_num):
+        return Trucks(18, 0.0, depot, start, [])
+
+    # Build the truck loads from the package constraints, or use the hand-written manifest
+    if trips is None and AUTO_ASSIGN:
+        trips = assign_packages((package for packageID, package in packageHash.items()), context.distanceMatrix,
+                                capacity=TRUCK_CAPACITY, start=start, correction_time=ADDRESS_CORRECTION_TIME)
+    elif trips is None:
+        trips = TRUCK_TRIPS
+
+    # Simulate the day: all trucks share one clock, and a trip leaves when a truck and a driver are free
+    try:
+        fleet = simulate_fleet(trips, deliver, make_truck, depot,
+                               truck_count=truck_count if truck_count is not None else TRUCK_COUNT,
+                               driver_count=driver_count if driver_count is not None else DRIVER_COUNT, start=start)
+    finally:
+        if statusWriter is not None:
+            statusWriter.close()
+
+    if INSTRUMENTATION_FILE:
+        context.instrumentation.export(INSTRUMENTATION_FILE)
+    return fleet
+
+
 '''
      ,------------------------------------------------------------------------------------------------,
      |                                         MAIN FUNCTION                                          |
@@ -642,39 +1212,38 @@ def print_total_metrics(total_distance, total_time_corrected, total_packages_del
 '''
 
 
-def main():
-    console = Console(color_system="256")
-    # Print Title
-    print(BOLDORANGE + "\n\n\nWestern Governors University Parcel Service" + RESET)
-    print("Author: Aaron Ballesteros")
-    print("ID: 011019047")
-    # Initialize truck objects (truck1, truck2, truck3) here
-    truck1 = Trucks(18, 0.0, "4001 South 700 East", datetime.timedelta(hours=8),
-                    [1, 29, 7, 30, 8, 34, 40, 13, 39, 14, 15, 16, 19, 20, 37])
-    truck2 = Trucks(18, 0.0, "4001 South 700 East", datetime.timedelta(hours=11),
-                    [6, 5, 21, 4, 24, 23, 26, 22, 10, 11, 31])
-    truck3 = Trucks(18, 0.0, "4001 South 700 East", datetime.timedelta(hours=9, minutes=5),
-                    [17, 12, 25, 28, 32, 3, 18, 36, 38, 27, 35, 2, 33, 9])
-
-    # Initialize status logs for each truck
-    status_logs_truck1 = truckDeliverPackages(truck1, 1)
-    truck2.departTime = min(truck1.time, truck3.time)
-    status_logs_truck2 = truckDeliverPackages(truck2, 2)
-    status_logs_truck3 = truckDeliverPackages(truck3, 3)
+def main(headless=False):
+    packageHash = context.packageHash
+    if not headless:
+        # Print Title
+        print(BOLDORANGE + "\n\n\nWestern Governors University Parcel Service" + RESET)
+        print("Author: Aaron Ballesteros")
+        print("ID: 011019047")
+
+    fleet = simulate_day(headless)
 
     # Calculate the corrected total time in hours
-    total_time_corrected = (
-                                   (truck1.time.total_seconds() - truck1.departTime.total_seconds())
-                                   + (truck2.time.total_seconds() - truck2.departTime.total_seconds())
-                                   + (truck3.time.total_seconds() - truck3.departTime.total_seconds())
-                           ) / 3600  # Convert total seconds to hours
+    total_time_corrected = sum((trip.returned - trip.depart).total_seconds() for trip in fleet.trips) / 3600
 
     # Calculate the total distance and total packages delivered
-    total_distance = truck1.miles + truck2.miles + truck3.miles
-    total_packages_delivered = len(truck1.packages) + len(truck2.packages) + len(truck3.packages)
+    total_distance = sum(truck.miles for truck in fleet.trucks.values())
+    total_packages_delivered = sum(len(trip.packages) for trip in fleet.trips)
 
+    # Headless run: report the totals as plain text and skip the rendering and the menu
+    if headless:
+        print(f"Total Distance: {total_distance:.1f} miles")
+        print(f"Total Time: {total_time_corrected:.1f} hours")
+        print(f"Packages Delivered: {total_packages_delivered}")
+        return fleet
+
+    from rich.console import Console
+
+    console = Console(color_system="256")
     print_total_metrics(total_distance, total_time_corrected, total_packages_delivered)
 
+    # Build the read-only status timeline once; lookups query it instead of updating the packages
+    timeline = StatusTimeline((package for packageID, package in packageHash.items()), ADDRESS_HISTORY)
+
     # Main program loop
     while True:
         # Display the menu to the user and get the user's choice
@@ -688,30 +1257,26 @@ def main():
         # If the user chooses to begin the delivery simulation
         elif user_choice.lower() == 'd':
             console.print("\n\n\n[yellow]Beginning delivery simulation...[/yellow]\n\n\n")
-            time.sleep(1)
+            time.sleep(DISPLAY_PAUSE * 2)
 
             # Print Delivery Logs (statusStops, statusDelivered, statusHub)
 
-            # Creating the table
-            table1 = create_and_print_table(status_logs=status_logs_truck1)
-            table2 = create_and_print_table(status_logs=status_logs_truck2)
-            table3 = create_and_print_table(status_logs=status_logs_truck3)
-            console = Console(color_system="256")
-
             # Printing the truck metrics and tables
             console.print("\n[bold][green]Delivery complete for all trucks![green][/bold]\n")
-            time.sleep(0.5)
-            print(log_truck_metrics_with_date(truck1, 1))
-            time.sleep(0.5)
-            console.print(table1)
-            time.sleep(0.5)
-            print(log_truck_metrics_with_date(truck2, 2))
-            time.sleep(0.5)
-            console.print(table2)
-            time.sleep(0.5)
-            print(log_truck_metrics_with_date(truck3, 3))
-            time.sleep(0.5)
-            console.print(table3)
+            for truck_num, truck in fleet.trucks.items():
+                if not truck.trips:
+                    continue
+                time.sleep(DISPLAY_PAUSE)
+                print(log_truck_metrics_with_date(truck, truck_num))
+                time.sleep(DISPLAY_PAUSE)
+                renderStarted = time.perf_counter()
+                console.print(create_and_print_table(status_logs=fleet.logs[truck_num]))
+                if context.instrumentation is not None:
+                    context.instrumentation.add(truck_num, "render", 1, time.perf_counter() - renderStarted)
+
+            # Export again to include the rendering times
+            if INSTRUMENTATION_FILE:
+                context.instrumentation.export(INSTRUMENTATION_FILE)
 
             print_total_metrics(total_distance, total_time_corrected, total_packages_delivered)
 
@@ -739,12 +1304,13 @@ def main():
                     if package_id:  # if the user didn't press Enter
                         package_id = int(
                             package_id)  # try to convert to integer. This will raise ValueError if it fails.
-                        if package_id < 1 or package_id > 40:  # assuming package_id should be positive.
-                            raise ValueError("Package ID must be a positive number.")
-                        packages_to_view = [packageHash.search(package_id)]
+                        package_status = timeline.status_at(package_id, time_change)
+                        if package_status is None:  # any ID in the loaded manifest is valid
+                            raise ValueError(f"There is no package #{package_id}.")
+                        packages_to_view = [package_status]
                         break  # if conversion to integer succeeded, exit the loop
                     else:
-                        packages_to_view = [packageHash.search(i) for i in range(1, 41)]  # Assuming 40 packages
+                        packages_to_view = timeline.all_at(time_change)
                         break  # if the user pressed Enter, exit the loop
                 except ValueError as e:
                     # Display error message to user and continue the loop
@@ -761,16 +1327,15 @@ def main():
                     else:
                         # Display selected parameter for the entered package ID
                         package = packages_to_view[0]
-                        package.statusUpdate(time_change)
                         create_and_print_parameter_table(package, param_choice)
                         break
             else:
-                # Display all parameters using create_and_print_package_table for all packages
-                for package in packages_to_view:
-                    package.statusUpdate(time_change)
-                    create_and_print_package_table(package)
+                # Display all packages at the chosen time in a single table
+                create_and_print_packages_table(
+                    packages_to_view, title=f"\n[bold][yellow]All Packages at {time_change}[/yellow][/bold]")
 
 
 
 if __name__ == "__main__":
-    main()
+    # `python main.py --headless` runs the simulation without tables, pauses or the menu
+    main(headless="--headless" in sys.argv[1:])
@@ -0,0 +1,218 @@
+"""
+
+Description: Parallel Scenario Module for the WGUPS Parcel Service Program
+
+Runs independent delivery simulations (what-if scenarios such as other fleet sizes, start times or
+truck loads) and independent truck routes on a pool of worker processes. The distance matrix is
+copied once into a shared memory block that every worker attaches to when it starts, so it is never
+pickled per task; a task only sends its trip list and receives a compact, picklable result.
+
+A single simulated day stays sequential: when a trip leaves depends on when the previous trucks
+return (see fleet.simulate_fleet). The parallelism is across scenarios, and across truck loads that
+are routed on their own (route_trucks).
+
+"""
+
+# Python core libraries - Functionality
+import copy
+import datetime
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Project modules - Routing data
+import main
+from assignment import assign_packages
+from distances import SharedMatrixHandle
+from fleet import simulate_fleet
+
+# One what-if run: the truck loads and the fleet configuration to simulate them with.
+Scenario = namedtuple("Scenario", ["name", "trips", "truck_count", "driver_count", "start", "improve"])
+Scenario.__new__.__defaults__ = (3, 2, datetime.timedelta(hours=8), False)
+
+# Outcome of a scenario: total miles, when the last truck returned, the IDs of packages delivered after
+# their deadline and the fleet.TripRecord of every trip.
+ScenarioResult = namedtuple("ScenarioResult", ["name", "miles", "finish", "late", "trips"])
+
+# Outcome of routing one truck load on its own: departure and return time, miles, the package IDs in
+# delivery order and the status logs.
+TripRoute = namedtuple("TripRoute", ["truck", "depart", "returned", "miles", "packages", "logs"])
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  WORKER INITIALIZER FUNCTION                                   |
+#     | |                         _init_worker(handle, package_file, packageHash)                        |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function runs once in every worker process. It attaches to the shared distance
+#     |                matrix and replaces the worker's delivery context, so truckDeliverPackages reads the
+#     |                shared distances and the worker's own copy of the packages. A provider other than the
+#     |                dense matrix (see providers.py) is small enough to be sent to the worker as is. The
+#     |                packages are a copy of the parent's package hash table rather than a fresh parse of
+#     |                package_file, so a manifest installed in memory (DeliveryContext.useManifest, as
+#     |                runs.py does) is routed by the workers too. _copy_context builds the same context
+#     |                for the serial path in the current process.
+#     |
+#     |   Time Complexity: O(n + p) for n addresses and p packages
+# '''
+def _init_worker(handle, package_file, packageHash):
+    matrix = main.DistanceMatrix.attach(handle) if isinstance(handle, SharedMatrixHandle) else handle
+    main.context = _copy_context(matrix, package_file, packageHash)
+
+
+def _copy_context(matrix, package_file, packageHash):
+    context = main.DeliveryContext(package_file=package_file, distance_matrix=matrix)
+    context.useManifest(packageHash, package_file)
+    return context
+
+
+def _reset_packages(packageIDs=None):
+    packageHash = main.context.packageHash
+    if packageIDs is None:
+        packageIDs = [packageID for packageID, package in packageHash.items()]
+    for packageID in packageIDs:
+        package = packageHash.search(packageID)
+        if package is not None:
+            package.deliveryTime = None
+            package.departureTime = None
+
+
+def _late_packages(trips):
+    packageHash = main.context.packageHash
+    late = []
+    for trip in trips:
+        for packageID in trip.packages:
+            package = packageHash.search(packageID)
+            if package.deadlineTime is not None and package.deliveryTime > package.deadlineTime:
+                late.append(packageID)
+    return sorted(late)
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                    SCENARIO RUN FUNCTION                                       |
+#     | |                                      run_scenario(scenario)                                    |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function simulates one scenario in the current process against main.context,
+#     |                after clearing the delivery times left by the previous scenario. It is the task that
+#     |                run_scenarios sends to the worker processes.
+#     |
+#     |   Time Complexity: O(R) where R is the routing time of the scenario's trips
+# '''
+def run_scenario(scenario):
+    _reset_packages()
+
+    def deliver(truck, truck_num):
+        return main.truckDeliverPackages(truck, truck_num, improve=scenario.improve, headless=True)
+
+    def make_truck(truck_num):
+        return main.Trucks(18, 0.0, main.HUB, scenario.start, [])
+
+    fleet = simulate_fleet(scenario.trips, deliver, make_truck, main.HUB, truck_count=scenario.truck_count,
+                           driver_count=scenario.driver_count, start=scenario.start)
+    miles = sum(truck.miles for truck in fleet.trucks.values())
+    return ScenarioResult(scenario.name, round(miles, 1), fleet.finish, _late_packages(fleet.trips), fleet.trips)
+
+
+def _route_trip(task):
+    truck_num, trip, improve = task
+    _reset_packages(trip.packages)
+    truck = main.Trucks(18, 0.0, main.HUB, trip.ready, list(trip.packages))
+    logs = main.truckDeliverPackages(truck, truck_num, improve=improve)
+    return TripRoute(truck_num, trip.ready, truck.time, truck.miles, list(truck.packages), logs)
+
+
+def _map(function, tasks, workers):
+    tasks = list(tasks)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(tasks))
+    if workers <= 1 or len(tasks) <= 1:
+        # Route a copy of the packages, like the workers do, so the caller's delivery times are kept
+        previous = main.context
+        main.context = _copy_context(previous.distanceMatrix, previous.package_file,
+                                     copy.deepcopy(previous.packageHash))
+        try:
+            return [function(task) for task in tasks]
+        finally:
+            main.context = previous
+
+    # Copy the matrix into shared memory once; workers attach to it by name in _init_worker. The package
+    # table is pickled to every worker, so they route the parent's packages whatever their source.
+    matrix = main.context.distanceMatrix
+    block, handle = matrix.share() if matrix.dense else (None, matrix)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(handle, main.context.package_file, main.context.packageHash)) as pool:
+            return list(pool.map(function, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                 PARALLEL EXECUTION FUNCTIONS                                   |
+    |                               Time Complexity: O(R / w + n^2)                                  |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: These functions spread independent work over a ProcessPoolExecutor with `workers`
+                 processes (the number of CPUs by default). With one worker, or a single task, the work
+                 runs in the current process instead. Results are returned in the order of the input.
+                 Either way the tasks route copies of main.context's packages, so the delivery times
+                 of the caller's packages (e.g. from main.simulate_day) are left as they were.
+    Functions:
+        1. run_scenarios: Simulates every Scenario and returns its ScenarioResult.
+        2. route_trucks: Routes every fleet.Trip on its own truck, leaving the hub at the trip's ready
+                         time (drivers are not a constraint), and returns its TripRoute. Trips without
+                         a required truck are numbered by their position in the list.
+
+    Time Complexity: O(R / w + n^2) where R is the total routing time, w the number of workers and n^2
+                     the size of the distance matrix copied into shared memory.
+
+'''
+
+
+def run_scenarios(scenarios, workers=None):
+    return _map(run_scenario, scenarios, workers)
+
+
+def route_trucks(trips, improve=False, workers=None):
+    tasks = [(trip.truck if trip.truck is not None else i + 1, trip, improve) for i, trip in enumerate(trips)]
+    return _map(_route_trip, tasks, workers)
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  SCENARIO SWEEP FUNCTION                                       |
+#     | |                                       scenario_sweep()                                         |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function builds the default what-if sweep: the hand-written and the
+#     |                automatically assigned truck loads, with one to three drivers, with and without the
+#     |                route improvement pass.
+#     |
+#     |   Time Complexity: O(p log p) for the automatic assignment of p packages
+# '''
+def scenario_sweep():
+    manifests = {
+        "manual": main.TRUCK_TRIPS,
+        "auto": assign_packages((package for packageID, package in main.context.packageHash.items()),
+                                main.context.distanceMatrix, capacity=main.TRUCK_CAPACITY, start=main.DAY_START,
+                                correction_time=main.ADDRESS_CORRECTION_TIME),
+    }
+    scenarios = []
+    for manifest, trips in manifests.items():
+        for drivers in (1, 2, 3):
+            for improve in (False, True):
+                name = f"{manifest}, {drivers} driver{'s' if drivers > 1 else ''}{', improved' if improve else ''}"
+                scenarios.append(Scenario(name, trips, main.TRUCK_COUNT, drivers, main.DAY_START, improve))
+    return scenarios
+
+
+if __name__ == "__main__":
+    import sys
+
+    workerCount = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    for result in run_scenarios(scenario_sweep(), workers=workerCount):
+        late = ", ".join(str(packageID) for packageID in result.late) or "none"
+        print(f"{result.name:<32} {result.miles:>7.1f} miles   finish {result.finish}   late: {late}")
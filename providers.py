@@ -0,0 +1,250 @@
+"""
+
+Description: Distance Provider Module for the WGUPS Parcel Service Program
+
+Distance providers for address books too large for the dense DistanceMatrix, which needs n^2 doubles
+(20 GB for 50,000 addresses). Both implement distances.DistanceProvider, so the routers, the truck
+assignment and betweenst use them unchanged:
+
+  - SparseDistanceGraph keeps the k nearest neighbors of every address, O(n k) memory, and answers
+    other pairs with the shortest path through that graph, resuming cached searches per source.
+  - CoordinateDistances estimates distances from address coordinates (haversine for latitude and
+    longitude, or Euclidean), optionally answering exact distances from a slower source through an
+    LRU cache of pairs.
+
+"""
+
+# Python core libraries - Functionality
+import csv
+import math
+from array import array
+from collections import OrderedDict
+from heapq import heappop, heappush, heapreplace
+
+# Project modules - Routing data
+from distances import DistanceProvider, read_address_book
+
+# Mean radius of the Earth in miles, for haversine distances
+EARTH_RADIUS_MILES = 3958.8
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                SPARSE DISTANCE GRAPH CLASS                                     |
+    |                              Time Complexity: O(1) to O(E log n)                               |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class keeps, for every address, the exact distances to its k nearest addresses
+                 (and to every address that has it among its k nearest, so the graph is symmetric). The
+                 distance between two neighbors is their exact distance; any other pair is the shortest
+                 path through the graph (Dijkstra), which follows the road distances of the table rather
+                 than a straight line. The search from a source stops as soon as the target is settled
+                 and is kept in an LRU cache of `cache_size` sources, so the next lookup from the same
+                 address (the routers ask for the distances from the truck's address to every remaining
+                 stop) resumes where it stopped. Pairs the graph does not connect are answered by the
+                 fallback provider, or are infinite.
+    Methods:
+        1. __init__: Stores the neighbor distances ({address index: distance} per address).
+        2. from_csv: Streams the lower-triangular distance table and keeps the k nearest neighbors of
+                     every address. The whole table is still read, but never held in memory.
+        3. distance: Returns the distance between two address indices.
+        4. distances: Returns the distances from one address index to a list of address indices, with
+                      one search.
+
+    Time Complexity:
+        - from_csv: O(n^2 log k) to read the table, O(n k) memory.
+        - distance / distances: O(1) for neighbors and cached pairs, O(E log n) for a new search over
+                                the E edges it reaches.
+
+'''
+
+
+class SparseDistanceGraph(DistanceProvider):
+    def __init__(self, streets, names, neighbors, cache_size=64, fallback=None):
+        super().__init__(streets, names)
+        if len(neighbors) != self.size:
+            raise ValueError(f"Expected neighbors for {self.size} addresses, got {len(neighbors)}")
+        self.neighbors = neighbors
+        self.cache_size = cache_size
+        self.fallback = fallback
+        # Source address -> (settled distances, search heap, best known distances)
+        self._searches = OrderedDict()
+
+    @classmethod
+    def from_csv(cls, address_file, distance_file, k=8, cache_size=64, fallback=None):
+        streets, names = read_address_book(address_file)
+        size = len(streets)
+        # Max-heaps of (-distance, address) holding the k nearest addresses seen so far
+        nearest = [[] for _ in range(size)]
+
+        def offer(addy, other, distance):
+            heap = nearest[addy]
+            if len(heap) < k:
+                heappush(heap, (-distance, other))
+            elif distance < -heap[0][0]:
+                heapreplace(heap, (-distance, other))
+
+        with open(distance_file) as disCSV:
+            for i, row in enumerate(csv.reader(disCSV)):
+                if i >= size:
+                    break
+                for j, cell in enumerate(row[:i]):
+                    if cell != '':
+                        distance = float(cell)
+                        offer(i, j, distance)
+                        offer(j, i, distance)
+
+        neighbors = [{} for _ in range(size)]
+        for addy, heap in enumerate(nearest):
+            for negative, other in heap:
+                neighbors[addy][other] = -negative
+                neighbors[other][addy] = -negative
+        return cls(streets, names, neighbors, cache_size, fallback)
+
+    def _search(self, source):
+        search = self._searches.get(source)
+        if search is None:
+            search = self._searches[source] = ({}, [(0.0, source)], {source: 0.0})
+            if len(self._searches) > self.cache_size:
+                self._searches.popitem(last=False)
+        else:
+            self._searches.move_to_end(source)
+        return search
+
+    def _settle(self, search, target):
+        settled, heap, best = search
+        neighbors = self.neighbors
+        bestDistance = best.get
+        inf = math.inf
+        while target not in settled and heap:
+            distance, addy = heappop(heap)
+            if addy in settled:
+                continue
+            settled[addy] = distance
+            # Settled addresses already have a best distance no longer than any new candidate
+            for other, weight in neighbors[addy].items():
+                candidate = distance + weight
+                if candidate < bestDistance(other, inf):
+                    best[other] = candidate
+                    heappush(heap, (candidate, other))
+        return settled.get(target)
+
+    def _unreachable(self, addy1, addy2):
+        return self.fallback.distance(addy1, addy2) if self.fallback is not None else math.inf
+
+    def distance(self, addy1, addy2):
+        if addy1 == addy2:
+            return 0.0
+        direct = self.neighbors[addy1].get(addy2)
+        if direct is not None:
+            return direct
+        # Always searched from addy1, so distance() and distances() agree to the last bit
+        distance = self._settle(self._search(addy1), addy2)
+        return distance if distance is not None else self._unreachable(addy1, addy2)
+
+    def distances(self, addy, targets):
+        search = None
+        direct = self.neighbors[addy]
+        values = []
+        for target in targets:
+            if target == addy:
+                values.append(0.0)
+            elif target in direct:
+                values.append(direct[target])
+            else:
+                if search is None:
+                    search = self._search(addy)
+                distance = self._settle(search, target)
+                values.append(distance if distance is not None else self._unreachable(addy, target))
+        return array('d', values)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                COORDINATE DISTANCES CLASS                                      |
+    |                                  Time Complexity: O(1)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class estimates distances from the coordinates of the addresses: the great-circle
+                 (haversine) distance in miles between (latitude, longitude) points, or the Euclidean
+                 distance between (x, y) points in miles, times a road factor for the detours of the
+                 street network. When an exact source is given (a function of two address indices,
+                 e.g. a routing service or SparseDistanceGraph.distance), distance() returns exact
+                 distances instead, keeping the last `cache_size` pairs in an LRU cache; estimate()
+                 stays available for cheap comparisons. Exact pairs can also be recorded directly.
+    Methods:
+        1. __init__: Stores the coordinates, the metric and the optional exact source.
+        2. from_csv: Loads the address book and a coordinate CSV file (address ID, x or latitude,
+                     y or longitude per row).
+        3. estimate: Returns the estimated distance between two address indices.
+        4. distance: Returns the exact distance from the cache or the exact source, or the estimate.
+        5. record: Adds an exact distance to the cache.
+
+    Time Complexity:
+        - from_csv: O(n)
+        - estimate / record: O(1)
+        - distance: O(1) for estimates and cached pairs, plus the exact source on a cache miss.
+
+'''
+
+
+class CoordinateDistances(DistanceProvider):
+    def __init__(self, streets, names, points, metric="haversine", factor=1.0, exact=None, cache_size=4096):
+        super().__init__(streets, names)
+        if metric not in ("haversine", "euclidean"):
+            raise ValueError(f"Unknown metric {metric!r}; use 'haversine' or 'euclidean'")
+        if len(points) != self.size:
+            raise ValueError(f"Expected coordinates for {self.size} addresses, got {len(points)}")
+        self.points = points
+        self.metric = metric
+        self.factor = factor
+        self.exact = exact
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        if metric == "haversine":
+            self._radians = [(math.radians(lat), math.radians(lon)) for lat, lon in points]
+
+    @classmethod
+    def from_csv(cls, address_file, coordinate_file, metric="haversine", factor=1.0, exact=None, cache_size=4096):
+        streets, names = read_address_book(address_file)
+        points = [None] * len(streets)
+        with open(coordinate_file) as coordinateCSV:
+            for row in csv.reader(coordinateCSV):
+                if row:
+                    points[int(row[0])] = (float(row[1]), float(row[2]))
+        missing = [addy for addy, point in enumerate(points) if point is None]
+        if missing:
+            raise ValueError(f"{coordinate_file} has no coordinates for address IDs {missing[:10]}")
+        return cls(streets, names, points, metric, factor, exact, cache_size)
+
+    def estimate(self, addy1, addy2):
+        if self.metric == "euclidean":
+            (x1, y1), (x2, y2) = self.points[addy1], self.points[addy2]
+            return math.hypot(x1 - x2, y1 - y2) * self.factor
+        (lat1, lon1), (lat2, lon2) = self._radians[addy1], self._radians[addy2]
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a))) * self.factor
+
+    def distance(self, addy1, addy2):
+        if addy1 == addy2:
+            return 0.0
+        key = (addy1, addy2) if addy1 < addy2 else (addy2, addy1)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        if self.exact is None:
+            return self.estimate(addy1, addy2)
+        self.misses += 1
+        distance = self.exact(addy1, addy2)
+        self.record(addy1, addy2, distance)
+        return distance
+
+    def record(self, addy1, addy2, distance):
+        key = (addy1, addy2) if addy1 < addy2 else (addy2, addy1)
+        self._cache[key] = distance
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
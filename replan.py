@@ -0,0 +1,371 @@
+"""
+
+Description: Incremental Re-Planning Module for the WGUPS Parcel Service Program
+
+Keeps the planned tours of a simulated day and repairs them when live events arrive: an address
+correction (such as package 9's wrong address, known at 10:20), a package arriving late at the hub,
+or a truck being delayed. Only the tour of the affected truck is touched, and only the part it has
+not driven yet: the stops already behind the truck (and the one it is driving to) stay as they are,
+the changed package is removed or inserted at its cheapest position, and the rest of the tour is
+improved from the truck's position with routing.improve_route, reusing the existing visit order and
+the distance matrix.
+
+"""
+
+# Python core libraries - Functionality
+import datetime
+from collections import namedtuple
+
+# Project modules - Routing data
+from routing import Stop, improve_route, route_miles
+
+# Live events. Times are timedeltas since midnight, like the rest of the simulation.
+AddressCorrection = namedtuple("AddressCorrection", ["time", "package", "street", "zip"])
+LatePackage = namedtuple("LatePackage", ["time", "package"])
+TruckDelay = namedtuple("TruckDelay", ["time", "truck", "minutes"])
+
+
+def _hours(value):
+    return value.total_seconds() / 3600
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                     TRUCK PLAN CLASS                                           |
+    |                                  Time Complexity: O(n)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class is the planned tour of one truck trip: the departure time, the address it
+                 starts from and returns to, the stops (routing.Stop with package objects) in visit
+                 order and the arrival time at every stop in hours since midnight. A stop is committed
+                 at a time once the truck has left for it, so a repair never changes the stops behind
+                 the truck or the stop it is driving to. A delay after the last stop is kept in
+                 returnWait and only moves the return to the hub.
+    Methods:
+        1. __init__: Stores the tour and computes the arrival times.
+        2. retime: Recomputes the arrival times from a stop onwards.
+        3. committed: Returns the number of stops committed at a time.
+        4. position: Returns the address and time the untouched part of the tour starts from.
+        5. remove: Removes a package from the uncommitted stops.
+        6. insertion: Returns the cheapest place and extra miles to add an address after the commitment.
+        7. insert: Adds a package at its cheapest place (or to a stop at the same address).
+        8. delay: Delays the truck at a time by a number of hours.
+        9. repair: Improves the uncommitted stops from the truck's position.
+        10. miles: Returns the length of the tour.
+        11. load: Returns the number of packages on the trip.
+        12. locate: Returns the stop index of a package.
+        13. finish: Returns the time the truck is back at the hub.
+
+    Time Complexity:
+        - __init__ / retime / committed / remove / insertion / insert / delay / miles / load / locate: O(n)
+        - finish: O(1)
+        - repair: bounded by the time budget of improve_route.
+
+'''
+
+
+class TruckPlan:
+    def __init__(self, matrix, truck, depart, start, end, stops, speed=18):
+        self.matrix = matrix
+        self.truck = truck
+        self.depart = depart
+        self.start = start
+        self.end = end
+        self.stops = list(stops)
+        self.speed = speed
+        # Extra hours spent before reaching each stop (truck delays)
+        self.waits = [0.0] * len(self.stops)
+        self.returnWait = 0.0
+        self.arrivals = []
+        self.retime()
+
+    def retime(self, first=0):
+        del self.arrivals[first:]
+        clock = self.arrivals[-1] if self.arrivals else self.depart
+        current = self.stops[first - 1].address if first else self.start
+        for i in range(first, len(self.stops)):
+            clock += self.waits[i] + self.matrix.distance(current, self.stops[i].address) / self.speed
+            current = self.stops[i].address
+            self.arrivals.append(clock)
+
+    def committed(self, when):
+        count = 0
+        leave = self.depart
+        while count < len(self.stops) and leave <= when:
+            leave = self.arrivals[count]
+            count += 1
+        return count
+
+    def position(self, when):
+        count = self.committed(when)
+        if count == 0:
+            return count, self.start, max(self.depart, when)
+        return count, self.stops[count - 1].address, self.arrivals[count - 1]
+
+    def remove(self, packageID, when):
+        first = self.committed(when)
+        for i in range(first, len(self.stops)):
+            stop = self.stops[i]
+            for package in stop.packages:
+                if package.ID == packageID:
+                    stop.packages.remove(package)
+                    if not stop.packages:
+                        del self.stops[i]
+                        del self.waits[i]
+                    self.retime(min(i, len(self.arrivals)))
+                    return package
+        return None
+
+    def insertion(self, addy, when):
+        first, previous, clock = self.position(when)
+        distance = self.matrix.distance
+        best = None
+        bestDelta = None
+        for i in range(first, len(self.stops) + 1):
+            following = self.stops[i].address if i < len(self.stops) else self.end
+            delta = distance(previous, addy) + distance(addy, following) - distance(previous, following)
+            if bestDelta is None or delta < bestDelta:
+                best, bestDelta = i, delta
+            previous = following
+        return best, bestDelta
+
+    def insert(self, package, street, when):
+        addy = self.matrix.index_of(street)
+        first = self.committed(when)
+        for i in range(first, len(self.stops)):
+            if self.stops[i].address == addy:
+                self.stops[i].packages.append(package)
+                return i
+        position, delta = self.insertion(addy, when)
+        self.stops.insert(position, Stop(addy, street, [package]))
+        self.waits.insert(position, 0.0)
+        self.retime(min(position, len(self.arrivals)))
+        return position
+
+    def delay(self, when, hours):
+        count = self.committed(when)
+        if count == 0:
+            self.depart = max(self.depart, when) + hours
+            self.retime()
+        elif count == len(self.stops) and when >= self.arrivals[-1]:
+            self.returnWait += hours  # Driving back to the hub
+        else:
+            self.waits[count - 1] += hours
+            self.retime(count - 1)
+
+    def repair(self, when, time_budget=0.02):
+        first, start, clock = self.position(when)
+        remaining = self.stops[first:]
+        if len(remaining) < 2:
+            return None
+        deadlines = []
+        for stop in remaining:
+            stopDeadlines = [_hours(package.deadlineTime) for package in stop.packages
+                             if package.deadlineTime is not None]
+            deadlines.append(min(stopDeadlines) if stopDeadlines else None)
+        waits = self.waits[first:]
+        result = improve_route(self.matrix, start, self.end, [stop.address for stop in remaining],
+                               list(range(len(remaining))), depart=clock, speed=self.speed, deadlines=deadlines,
+                               time_budget=time_budget)
+        self.stops[first:] = [remaining[i] for i in result.order]
+        self.waits[first:] = [waits[i] for i in result.order]
+        self.retime(first)
+        return result
+
+    def miles(self):
+        stops = [stop.address for stop in self.stops]
+        return route_miles(self.matrix, self.start, self.end, stops, range(len(stops)))
+
+    def load(self):
+        return sum(len(stop.packages) for stop in self.stops)
+
+    def locate(self, packageID):
+        for i, stop in enumerate(self.stops):
+            if any(package.ID == packageID for package in stop.packages):
+                return i
+        return None
+
+    def finish(self):
+        if not self.stops:
+            return self.depart + self.returnWait
+        return (self.arrivals[-1] + self.returnWait
+                + self.matrix.distance(self.stops[-1].address, self.end) / self.speed)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                      LIVE PLAN CLASS                                           |
+    |                              Time Complexity: O(n) per event                                   |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class holds the truck plans of a day and applies live events to them:
+
+                   - AddressCorrection: the package is taken off its stop and inserted at the new
+                     street in the same truck's tour. A package already delivered, or on the stop
+                     the truck is driving to, cannot be moved: the correction is rejected, the
+                     package keeps its address and (event, reason) is added to `rejected`;
+                   - LatePackage: the package arriving at the hub is inserted into the tour of the
+                     trip that has not left yet, has fewer than `capacity` packages and gets the
+                     cheapest insertion; without one, it is kept in `unassigned` for a later trip;
+                   - TruckDelay: the truck's remaining arrivals (or its return to the hub, when the
+                     delay comes after its last stop) move back by the delay. Later trips of the
+                     same truck leave no earlier than it returns, and are repaired too.
+
+                 After each event the affected tour is repaired from the truck's position (2-opt /
+                 Or-opt without making deadlines worse, for at most time_budget seconds), and the
+                 changed TruckPlan is returned (None when nothing changed).
+    Methods:
+        1. __init__: Stores the plans and indexes them by package ID.
+        2. from_fleet: Builds the plans from a FleetResult (trip records in delivery order).
+        3. apply: Applies one event.
+        4. delivery_times: Returns {package ID: planned delivery time}.
+        5. at_risk: Returns the package IDs planned within margin of their deadline (or late).
+        6. miles: Returns the planned miles of all trips.
+
+    Time Complexity:
+        - from_fleet: O(p) for p packages.
+        - apply: O(n) for a tour of n stops, plus the repair time budget.
+        - delivery_times / at_risk / miles: O(p)
+
+'''
+
+
+class LivePlan:
+    def __init__(self, matrix, plans, time_budget=0.02, capacity=16):
+        self.matrix = matrix
+        self.plans = list(plans)
+        self.time_budget = time_budget
+        self.capacity = capacity
+        self.unassigned = []
+        self.rejected = []
+        self._planOf = {}
+        for plan in self.plans:
+            for stop in plan.stops:
+                for package in stop.packages:
+                    self._planOf[package.ID] = plan
+
+    @classmethod
+    def from_fleet(cls, fleet, packageHash, matrix, hub, speed=18, time_budget=0.02, capacity=16):
+        hubAddy = matrix.index_of(hub)
+        plans = []
+        for record in fleet.trips:
+            stops = []
+            for packageID in record.packages:
+                package = packageHash.search(packageID)
+                addy = matrix.index_of(package.street)
+                if stops and stops[-1].address == addy:
+                    stops[-1].packages.append(package)
+                else:
+                    stops.append(Stop(addy, package.street, [package]))
+            plans.append(TruckPlan(matrix, record.truck, _hours(record.depart), hubAddy, hubAddy, stops, speed))
+        return cls(matrix, plans, time_budget, capacity)
+
+    def apply(self, event):
+        when = _hours(event.time)
+        if isinstance(event, AddressCorrection):
+            plan = self._planOf.get(event.package)
+            if plan is None:
+                self.rejected.append((event, "not in the plan"))
+                return None
+            package = plan.remove(event.package, when)
+            if package is None:
+                stop = plan.locate(event.package)
+                self.rejected.append((event, "already delivered" if plan.arrivals[stop] <= when
+                                      else f"truck {plan.truck} is already driving to its stop"))
+                return None
+            # Packages.updateAddress keeps the street index of the package hash table in sync
+            package.updateAddress(event.street, event.zip if event.zip is not None else package.zip)
+            plan.insert(package, event.street, when)
+        elif isinstance(event, LatePackage):
+            waiting = [plan for plan in self.plans if plan.depart >= when and plan.load() < self.capacity]
+            if not waiting:
+                self.unassigned.append(event.package)
+                return None
+            addy = self.matrix.index_of(event.package.street)
+            plan = min(waiting, key=lambda candidate: candidate.insertion(addy, when)[1])
+            plan.insert(event.package, event.package.street, when)
+            self._planOf[event.package.ID] = plan
+        elif isinstance(event, TruckDelay):
+            plans = sorted((plan for plan in self.plans if plan.truck == event.truck and plan.finish() >= when),
+                           key=lambda candidate: candidate.depart)
+            if not plans:
+                return None  # The truck is done for the day
+            plan = plans[0]
+            plan.delay(when, event.minutes / 60)
+            plan.repair(when, self.time_budget)
+            # The truck's later trips cannot leave before it is back at the hub
+            previous = plan
+            for later in plans[1:]:
+                if later.depart >= previous.finish():
+                    break
+                later.depart = previous.finish()
+                later.retime()
+                later.repair(when, self.time_budget)
+                previous = later
+            return plan
+        else:
+            raise ValueError(f"Unknown event {event!r}")
+        plan.repair(when, self.time_budget)
+        return plan
+
+    def delivery_times(self):
+        times = {}
+        for plan in self.plans:
+            for stop, arrival in zip(plan.stops, plan.arrivals):
+                for package in stop.packages:
+                    times[package.ID] = datetime.timedelta(hours=arrival)
+        return times
+
+    def at_risk(self, margin=datetime.timedelta(0)):
+        limit = _hours(margin)
+        risky = []
+        for plan in self.plans:
+            for stop, arrival in zip(plan.stops, plan.arrivals):
+                risky.extend(package.ID for package in stop.packages
+                             if package.deadlineTime is not None and arrival > _hours(package.deadlineTime) - limit)
+        return sorted(risky)
+
+    def miles(self):
+        return sum(plan.miles() for plan in self.plans)
+
+
+if __name__ == "__main__":
+    import time
+
+    import main
+
+    fleet = main.simulate_day(headless=True)
+    packageHash = main.context.packageHash
+    livePlan = LivePlan.from_fleet(fleet, packageHash, main.context.distanceMatrix, main.HUB)
+    before = livePlan.delivery_times()
+    print(f"Planned: {livePlan.miles():.1f} miles")
+
+    # A customer moving package 21 before its truck leaves, package 9's known correction (the simulated
+    # day delivers it at 10:20, so the correction is rejected as already delivered), a package reaching
+    # the hub late and a truck held up in traffic
+    events = [AddressCorrection(datetime.timedelta(hours=9, minutes=15), 21, "2300 Parkway Blvd", "84119")]
+    for packageID, history in main.ADDRESS_HISTORY.items():
+        for changeTime, street, newZip in history[1:]:
+            events.append(AddressCorrection(changeTime, packageID, street, newZip))
+    latePackage = main.Packages(max(packageID for packageID, package in packageHash.items()) + 1, "1330 2100 S",
+                                "Salt Lake City", "UT", "84106", "EOD", "2", "Arrived late at the hub")
+    events.append(LatePackage(datetime.timedelta(hours=9, minutes=30), latePackage))
+    events.append(TruckDelay(datetime.timedelta(hours=10, minutes=30), 2, 20))
+
+    for event in sorted(events, key=lambda event: event.time):
+        started = time.perf_counter()
+        plan = livePlan.apply(event)
+        elapsed = (time.perf_counter() - started) * 1000
+        if plan is None and livePlan.rejected and livePlan.rejected[-1][0] is event:
+            print(f"{type(event).__name__} at {event.time}: rejected, {livePlan.rejected[-1][1]}")
+        elif plan is None and isinstance(event, LatePackage):
+            print(f"{type(event).__name__} at {event.time}: no trip with room left, kept unassigned")
+        elif plan is None:
+            print(f"{type(event).__name__} at {event.time}: nothing left to re-plan")
+        else:
+            print(f"{type(event).__name__} at {event.time}: truck {plan.truck} re-planned in {elapsed:.2f} ms")
+
+    after = livePlan.delivery_times()
+    moved = [packageID for packageID in sorted(after) if before.get(packageID) != after[packageID]]
+    print(f"Re-planned: {livePlan.miles():.1f} miles, {len(moved)} delivery times changed, "
+          f"at risk: {', '.join(str(packageID) for packageID in livePlan.at_risk()) or 'none'}")
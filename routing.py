@@ -0,0 +1,519 @@
+"""
+
+Description: Routing Engine Module for the WGUPS Parcel Service Program
+
+Holds the batched nearest-neighbor engine used by truckDeliverPackages. Instead of comparing the
+remaining packages one Python object at a time, the engine keeps the address index of every stop in
+an array, masks the stops that have already been visited and picks the next stop with a single argmin
+over the current address' row of the distance matrix (or, for the sparse and coordinate distance
+providers, over the distances to the stops only). NumPy is used for the argmin when it is
+installed; otherwise the builtin min() is used over the same row. A deadline-aware router ranks the
+stops by distance plus a deadline slack penalty in the same way.
+
+"""
+
+# Python core libraries - Functionality
+import datetime
+import math
+import time
+from collections import namedtuple
+
+# Third-party libraries - Optional vectorized math
+# NumPy is imported on first use by _load_numpy(), so importing this module stays cheap.
+numpy = None
+_numpy_checked = False
+
+
+def _load_numpy():
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as np
+        except ImportError:  # pragma: no cover - NumPy is optional
+            np = None
+        numpy = np
+    return numpy
+
+
+def _stop_distances(matrix, current, stops, indexes):
+    # NumPy array of the distances from current to every stop. A dense matrix row is read in place;
+    # other distance providers compute the distances to the stops only.
+    if matrix.dense:
+        return numpy.frombuffer(matrix.row(current), dtype=numpy.float64)[indexes]
+    return numpy.frombuffer(matrix.distances(current, stops), dtype=numpy.float64)
+
+
+def _stop_lookup(matrix, current, stops):
+    # Function from a stop position to its distance from current, without NumPy
+    if matrix.dense:
+        row = matrix.row(current)
+        return lambda position: row[stops[position]]
+    distances = matrix.distances(current, stops)
+    return distances.__getitem__
+
+
+def _nearest_pending(values, mask):
+    # Position of the smallest value among the stops not masked as visited, and that value. The
+    # positions are searched in reverse so that ties resolve to the last loaded stop.
+    pending = numpy.flatnonzero(~mask)
+    position = int(pending[len(pending) - 1 - int(numpy.argmin(values[pending][::-1]))])
+    return position, float(values[position])
+
+
+def _check_reachable(matrix, current, stops, position, distance):
+    # A provider without a path between two addresses (e.g. a disconnected SparseDistanceGraph without
+    # a fallback) returns an infinite distance; no route can reach that stop.
+    if distance == math.inf:
+        raise ValueError(f"Stop {matrix.streets[stops[position]]!r} (address {stops[position]}) is unreachable "
+                         f"from {matrix.streets[current]!r} (address {current})")
+    return position
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                               NEAREST NEIGHBOR ROUTER CLASS                                    |
+    |                                  Time Complexity: O(n)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class picks the visit order for a list of stops with the Nearest Neighbor
+                 Algorithm. The stops are address indices into the distance matrix, kept in the order
+                 they were loaded onto the truck. Stops listed in priority are always chosen first (in
+                 load order), which is how the deadline packages 25 and 6 are handled. Ties between
+                 equally near stops go to the stop loaded last, matching the original `<=` comparison.
+                 With a candidate index (spatial.CandidateIndex over the same stops), the nearest stop
+                 is searched among the stops near the current address first, evaluating far fewer
+                 distances on long routes with the same result. `evaluated` counts the distances
+                 evaluated so far. A stop the distance provider cannot reach (an infinite distance)
+                 raises ValueError instead of being visited.
+    Methods:
+        1. __init__: Initializes the stop array, visited mask and priority positions.
+        2. next_stop: Returns the position of the next stop to visit from the current address index.
+        3. visit: Marks a stop position as visited.
+        4. pending: Returns the positions of the stops that have not been visited yet.
+
+    Time Complexity:
+        - __init__: O(n)
+        - next_stop: O(n) vector operations per step, O(n^2) for a whole route; O(k log n) for k
+                     candidates with a candidate index.
+        - visit: O(1)
+        - pending: O(n)
+
+'''
+
+
+class NearestNeighborRouter:
+    def __init__(self, matrix, stops, priority=(), index=None):
+        self.matrix = matrix
+        self.stops = list(stops)
+        self.priority = sorted(priority)
+        self.visited = bytearray(len(self.stops))
+        self.remaining = len(self.stops)
+        self.index = index
+        self.evaluated = 0
+        if _load_numpy() is not None:
+            self._stops = numpy.asarray(self.stops, dtype=numpy.intp)
+            self._mask = numpy.zeros(len(self.stops), dtype=bool)
+
+    def next_stop(self, current):
+        if self.remaining == 0:
+            return None
+        for position in self.priority:
+            if not self.visited[position]:
+                return position
+
+        if self.index is not None:
+            stops = self.stops
+            distance = self.matrix.distance
+            position, evaluated = self.index.nearest(current, lambda i: distance(current, stops[i]))
+            self.evaluated += evaluated
+            return _check_reachable(self.matrix, current, stops, position, distance(current, stops[position]))
+
+        self.evaluated += self.remaining
+        if numpy is not None:
+            distances = _stop_distances(self.matrix, current, self.stops, self._stops)
+            position, nearest = _nearest_pending(distances, self._mask)
+            return _check_reachable(self.matrix, current, self.stops, position, nearest)
+
+        distance = _stop_lookup(self.matrix, current, self.stops)
+        position = min(reversed(self.pending()), key=distance)
+        return _check_reachable(self.matrix, current, self.stops, position, distance(position))
+
+    def visit(self, position):
+        if not self.visited[position]:
+            self.visited[position] = 1
+            self.remaining -= 1
+            if numpy is not None:
+                self._mask[position] = True
+            if self.index is not None:
+                self.index.remove(position)
+
+    def pending(self):
+        visited = self.visited
+        return [position for position in range(len(self.stops)) if not visited[position]]
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                        STOP CLASS                                              |
+    |                                  Time Complexity: O(1)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class represents one visit of a truck: an address index, its street and every
+                 package on the truck that is delivered to that address. Routing works on stops rather
+                 than packages, so packages that share an address cost one node in the route.
+
+'''
+
+
+class Stop:
+    __slots__ = ("address", "street", "packages")
+
+    def __init__(self, address, street, packages=None):
+        self.address = address
+        self.street = street
+        self.packages = packages if packages is not None else []
+
+    def __repr__(self):
+        return f"Stop({self.address}, {self.street!r}, {[package.ID for package in self.packages]})"
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                   STOP GROUPING FUNCTION                                       |
+#     | |                                  group_stops(packages, index_of)                               |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function groups packages by the address index of their street into Stop objects.
+#     |                Stops are returned in the order their first package appears, and the packages of a
+#     |                stop keep their load order.
+#     |
+#     |   Time Complexity: O(n)
+# '''
+def group_stops(packages, index_of):
+    stops = {}
+    for package in packages:
+        addy = index_of(package.street)
+        stop = stops.get(addy)
+        if stop is None:
+            stop = stops[addy] = Stop(addy, package.street)
+        stop.packages.append(package)
+    return list(stops.values())
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  DEADLINE PARSING FUNCTION                                     |
+#     | |                                     parse_deadline(deadline)                                   |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function converts a deadline string from the package file ("10:30 AM", "9:00 AM")
+#     |                into a timedelta since midnight. "EOD" and empty deadlines have no time limit and
+#     |                return None. A deadline is "H:MM AM" or "H:MM PM" (the space is optional) with hours
+#     |                1 to 12, or "HH:MM" in 24-hour format; minutes are 0 to 59. Anything else raises
+#     |                ValueError.
+#     |
+#     |   Time Complexity: O(1)
+# '''
+def parse_deadline(deadline):
+    text = deadline.strip().upper()
+    if text in ("", "EOD"):
+        return None
+    if text.endswith(("AM", "PM")):
+        clock, meridiem = text[:-2].strip(), text[-2:]
+    else:
+        clock, meridiem = text, ""
+    parts = clock.split(":")
+    if len(parts) != 2 or not all(part.isdigit() for part in parts) or meridiem not in ("", "AM", "PM"):
+        raise ValueError(f"invalid deadline {deadline!r}, expected H:MM AM or PM")
+    hours, minutes = int(parts[0]), int(parts[1])
+    if minutes > 59 or (not 1 <= hours <= 12 if meridiem else hours > 23):
+        raise ValueError(f"invalid deadline {deadline!r}, expected H:MM AM or PM")
+    if meridiem == "PM" and hours != 12:
+        hours += 12
+    elif meridiem == "AM" and hours == 12:
+        hours = 0
+    return datetime.timedelta(hours=hours, minutes=minutes)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                 DEADLINE-AWARE ROUTER CLASS                                    |
+    |                                 Time Complexity: O(n + d)                                      |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class picks the visit order for a list of stops by distance plus a slack penalty,
+                 instead of the fixed priority list used by NearestNeighborRouter. It keeps the clock of
+                 the truck (hours since midnight, starting at depart) and, for every pending stop, the
+                 arrival time if the truck drove there next. The cost of a stop is its distance plus
+
+                     slack_weight * speed * max(0, slack_horizon - slack)
+
+                 where slack is the stop's deadline minus that arrival time, so a stop is pulled forward
+                 once less than slack_horizon hours remain before its deadline. A stop reached before its
+                 earliest time (e.g. a wrong address that is only corrected at 10:20) costs
+                 slack_weight * speed miles per hour too early. Stops without a deadline or earliest
+                 time are ranked by distance alone, with the same tie-breaking as NearestNeighborRouter.
+                 Unreachable stops raise ValueError, as in NearestNeighborRouter.
+
+                 Feasibility check: before the cheapest stop is returned, every pending deadline stop that
+                 can still be reached on time directly is checked to be reachable on time after going to
+                 the cheapest stop first. If one is not, the most urgent such stop is returned instead.
+    Methods:
+        1. __init__: Initializes the stop arrays, time windows and clock.
+        2. next_stop: Returns the position of the next stop to visit from the current address index.
+        3. visit: Marks a stop position as visited and advances the clock to its arrival time.
+        4. pending: Returns the positions of the stops that have not been visited yet.
+
+    Time Complexity:
+        - __init__: O(n)
+        - next_stop: O(n) vector operations plus O(d) for the feasibility check, where d is the number
+                     of pending deadline stops.
+        - visit: O(1) plus O(d) to drop the stop from the pending deadline stops.
+        - pending: O(n)
+
+'''
+
+
+class DeadlineRouter:
+    def __init__(self, matrix, stops, start, deadlines=None, earliest=None, depart=0.0, speed=18,
+                 slack_weight=1.0, slack_horizon=0.5):
+        self.matrix = matrix
+        self.stops = list(stops)
+        self.deadlines = list(deadlines) if deadlines is not None else [None] * len(self.stops)
+        self.earliest = list(earliest) if earliest is not None else [None] * len(self.stops)
+        self.current = start
+        self.clock = depart
+        self.speed = speed
+        self.slack_weight = slack_weight
+        self.slack_horizon = slack_horizon
+        self.priority = []
+        self.visited = bytearray(len(self.stops))
+        self.remaining = len(self.stops)
+        self.evaluated = 0
+        self._pendingDeadlines = [position for position, deadline in enumerate(self.deadlines)
+                                  if deadline is not None]
+        if _load_numpy() is not None:
+            self._stops = numpy.asarray(self.stops, dtype=numpy.intp)
+            self._mask = numpy.zeros(len(self.stops), dtype=bool)
+            self._deadlines = numpy.array([numpy.inf if value is None else value for value in self.deadlines])
+            self._earliest = numpy.array([-numpy.inf if value is None else value for value in self.earliest])
+
+    def _cost(self, distance, position):
+        arrival = self.clock + distance / self.speed
+        penalty = 0.0
+        if self.deadlines[position] is not None:
+            penalty += max(0.0, self.slack_horizon - (self.deadlines[position] - arrival))
+        if self.earliest[position] is not None:
+            penalty += max(0.0, self.earliest[position] - arrival)
+        return distance + self.slack_weight * self.speed * penalty
+
+    def next_stop(self, current):
+        if self.remaining == 0:
+            return None
+
+        self.evaluated += self.remaining
+        if numpy is not None:
+            distances = _stop_distances(self.matrix, current, self.stops, self._stops)
+            arrival = self.clock + distances / self.speed
+            with numpy.errstate(invalid="ignore"):
+                penalty = (numpy.maximum(0.0, self.slack_horizon - (self._deadlines - arrival))
+                           + numpy.maximum(0.0, self._earliest - arrival))
+            cost = distances + self.slack_weight * self.speed * penalty
+            # An unreachable stop without a deadline gets an undefined (inf - inf) penalty; keep it last
+            cost[numpy.isnan(cost)] = numpy.inf
+            position, cheapest = _nearest_pending(cost, self._mask)
+        else:
+            distance = _stop_lookup(self.matrix, current, self.stops)
+            position = min(reversed(self.pending()), key=lambda i: self._cost(distance(i), i))
+            cheapest = self._cost(distance(position), position)
+
+        return self._feasible(current, _check_reachable(self.matrix, current, self.stops, position, cheapest))
+
+    def _feasible(self, current, position):
+        distance = self.matrix.distance
+        speed = self.speed
+        leave = self.clock + distance(current, self.stops[position]) / speed
+        urgent = None
+        urgentSlack = None
+        for other in self._pendingDeadlines:
+            if other == position:
+                continue
+            direct = self.clock + distance(current, self.stops[other]) / speed
+            deadline = self.deadlines[other]
+            if direct > deadline:
+                continue  # Late whichever stop comes next
+            if leave + distance(self.stops[position], self.stops[other]) / speed > deadline:
+                slack = deadline - direct
+                if urgent is None or slack < urgentSlack:
+                    urgent, urgentSlack = other, slack
+        return position if urgent is None else urgent
+
+    def visit(self, position):
+        if not self.visited[position]:
+            self.clock += self.matrix.distance(self.current, self.stops[position]) / self.speed
+            self.current = self.stops[position]
+            self.visited[position] = 1
+            self.remaining -= 1
+            if self.deadlines[position] is not None:
+                self._pendingDeadlines.remove(position)
+            if numpy is not None:
+                self._mask[position] = True
+
+    def pending(self):
+        visited = self.visited
+        return [position for position in range(len(self.stops)) if not visited[position]]
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  AT-RISK STOPS FUNCTION                                        |
+#     | |     at_risk_stops(matrix, start, stops, order, depart, speed, deadlines, earliest, margin)     |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function drives a planned visit order on paper before the truck is dispatched
+#     |                and returns the positions of the stops that are at risk: reached less than margin
+#     |                hours before their deadline (or after it), or before their earliest time. Times are
+#     |                hours since midnight, as in improve_route.
+#     |
+#     |   Time Complexity: O(n)
+# '''
+def at_risk_stops(matrix, start, stops, order, depart=0.0, speed=18, deadlines=None, earliest=None, margin=0.0):
+    deadlines = deadlines if deadlines is not None else [None] * len(stops)
+    earliest = earliest if earliest is not None else [None] * len(stops)
+    risky = []
+    clock = depart
+    current = start
+    for position in order:
+        clock += matrix.distance(current, stops[position]) / speed
+        current = stops[position]
+        if deadlines[position] is not None and clock > deadlines[position] - margin:
+            risky.append(position)
+        elif earliest[position] is not None and clock < earliest[position]:
+            risky.append(position)
+    return risky
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                ROUTE IMPROVEMENT FUNCTIONS                                     |
+    |                             Time Complexity: O(n^2) per pass                                   |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: These functions post-process a visit order produced by the Nearest Neighbor Algorithm
+                 with 2-opt (reverse a segment of the route) and Or-opt (move a run of 1 to 3 stops to
+                 another place in the route) local search. Every move is priced with a constant-time
+                 delta on the distance matrix, so only the four or six edges that change are looked up.
+                 The route starts at `start`, visits every stop once and ends at `end`.
+
+                 A move is only accepted when it shortens the route and does not increase the time
+                 window penalty: the hours a stop is delivered after its deadline plus the hours it is
+                 delivered before its earliest allowed time (e.g. a wrong address that is only corrected
+                 at 10:20). The first `fixed` stops of the order are never moved.
+    Functions:
+        1. route_miles: Returns the length of a visit order.
+        2. improve_route: Runs 2-opt and Or-opt until no move improves the route or the time budget
+                          runs out, and returns a RouteImprovement with the mileage before and after.
+
+    Time Complexity:
+        - route_miles: O(n)
+        - improve_route: O(n^2) per pass without time windows, O(n^3) per pass with them.
+
+'''
+
+RouteImprovement = namedtuple("RouteImprovement", ["order", "miles_before", "miles_after", "moves"])
+
+
+def route_miles(matrix, start, end, stops, order):
+    miles = 0.0
+    current = start
+    for position in order:
+        miles += matrix.distance(current, stops[position])
+        current = stops[position]
+    return miles + matrix.distance(current, end)
+
+
+def _window_penalty(matrix, start, stops, order, depart, speed, deadlines, earliest):
+    penalty = 0.0
+    clock = depart
+    current = start
+    for position in order:
+        clock += matrix.distance(current, stops[position]) / speed
+        current = stops[position]
+        if deadlines[position] is not None and clock > deadlines[position]:
+            penalty += clock - deadlines[position]
+        if earliest[position] is not None and clock < earliest[position]:
+            penalty += earliest[position] - clock
+    return penalty
+
+
+def improve_route(matrix, start, end, stops, order, fixed=0, depart=0.0, speed=18, deadlines=None,
+                  earliest=None, time_budget=0.05):
+    distance = matrix.distance
+    order = list(order)
+    count = len(order)
+    deadlines = deadlines if deadlines is not None else [None] * len(stops)
+    earliest = earliest if earliest is not None else [None] * len(stops)
+    windowed = any(value is not None for value in deadlines) or any(value is not None for value in earliest)
+    penalty = _window_penalty(matrix, start, stops, order, depart, speed, deadlines, earliest) if windowed else 0.0
+    miles_before = route_miles(matrix, start, end, stops, order)
+    stop_time = time.perf_counter() + time_budget
+    moves = 0
+
+    def node(i):
+        # Address index at route slot i, where slot -1 is the start and slot count is the end
+        if i < 0:
+            return start
+        if i >= count:
+            return end
+        return stops[order[i]]
+
+    def accept(candidate):
+        nonlocal penalty
+        if not windowed:
+            return True
+        candidate_penalty = _window_penalty(matrix, start, stops, candidate, depart, speed, deadlines, earliest)
+        if candidate_penalty > penalty + 1e-9:
+            return False
+        penalty = candidate_penalty
+        return True
+
+    improved = True
+    while improved and time.perf_counter() < stop_time:
+        improved = False
+
+        # 2-opt: reverse order[i..j]
+        for i in range(fixed, count - 1):
+            for j in range(i + 1, count):
+                a, b, c, d = node(i - 1), node(i), node(j), node(j + 1)
+                delta = distance(a, c) + distance(b, d) - distance(a, b) - distance(c, d)
+                if delta < -1e-9:
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    if accept(candidate):
+                        order = candidate
+                        moves += 1
+                        improved = True
+            if time.perf_counter() >= stop_time:
+                break
+
+        # Or-opt: move order[i..i+length-1] so that it follows slot k
+        for length in (1, 2, 3):
+            for i in range(fixed, count - length + 1):
+                e = i + length - 1
+                a, first, last, b = node(i - 1), node(i), node(e), node(e + 1)
+                removal_gain = distance(a, first) + distance(last, b) - distance(a, b)
+                for k in range(fixed - 1, count):
+                    if i - 1 <= k <= e:
+                        continue
+                    c, d = node(k), node(k + 1)
+                    delta = distance(c, first) + distance(last, d) - distance(c, d) - removal_gain
+                    if delta < -1e-9:
+                        segment = order[i:e + 1]
+                        rest = order[:i] + order[e + 1:]
+                        insert_at = k + 1 if k < i else k + 1 - length
+                        candidate = rest[:insert_at] + segment + rest[insert_at:]
+                        if accept(candidate):
+                            order = candidate
+                            moves += 1
+                            improved = True
+                            break
+                if time.perf_counter() >= stop_time:
+                    break
+
+    return RouteImprovement(order, miles_before, route_miles(matrix, start, end, stops, order), moves)
@@ -0,0 +1,243 @@
+"""
+
+Description: Multi-Day Run Module for the WGUPS Parcel Service Program
+
+Replays many delivery days, from any number of depots, against one loaded address book and distance
+table. Each job names a date, a depot street and a package manifest; the distance data is loaded once
+for the whole session, manifests are parsed once and kept (a manifest used again is reset in place:
+delivery times cleared and corrected addresses restored), and the trucks are rebuilt for every day.
+Every day produces DayMetrics, and summarize() aggregates them per date over all depots.
+
+Usage: python runs.py [jobs.csv] [--days 5] [--output metrics.json]
+
+A jobs file has one "date, depot street, manifest file" row per job (optionally followed by the number
+of trucks and drivers). Without one, the default manifest is replayed at the hub for --days days.
+
+"""
+
+# Python core libraries - Functionality
+import argparse
+import csv
+import datetime
+import json
+import os
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+
+# Project modules - Routing data
+import main
+from assignment import assign_packages
+
+# One day to simulate: the date, the depot street (an address of the address book), the manifest (a
+# package CSV file, or an already loaded package hash table), the truck loads (assigned automatically
+# from the package notes when None) and the fleet configuration (TRUCK_COUNT, DRIVER_COUNT and DAY_START
+# from main.py when None).
+RunJob = namedtuple("RunJob", ["date", "depot", "manifest", "trips", "truck_count", "driver_count", "start"])
+RunJob.__new__.__defaults__ = (None, None, None, None)
+
+# Outcome of one job: the packages in the manifest and delivered, total miles, when the last truck got
+# back, the IDs of packages delivered after their deadline, the trips run and the seconds it took.
+DayMetrics = namedtuple("DayMetrics", ["date", "depot", "packages", "delivered", "miles", "finish", "late",
+                                       "trips", "seconds"])
+
+# Metrics of one date over all of its depots.
+DaySummary = namedtuple("DaySummary", ["date", "depots", "packages", "delivered", "miles", "finish", "late",
+                                       "trips", "seconds"])
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                     RUN SESSION CLASS                                          |
+    |                               Time Complexity: O(p + R) per job                                |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class runs jobs one after another on a DeliveryContext (main.context by default),
+                 whose distance data is loaded on the first job and then reused. Manifest files are
+                 parsed into package hash tables once and the last `manifest_cache` of them are kept;
+                 when a job uses a kept manifest again, its packages are reset instead of re-read. The
+                 original street and zip code of every package are recorded when its manifest is first
+                 used, so address corrections made during a day are undone by the reset.
+    Methods:
+        1. __init__: Stores the context and the manifest cache size.
+        2. manifest: Returns the package hash table for a manifest, parsed or reset.
+        3. run: Simulates one RunJob and returns its DayMetrics.
+        4. run_all: Runs every job in order and returns the list of DayMetrics.
+
+    Time Complexity:
+        - manifest: O(p) for p packages, to parse or to reset.
+        - run: O(p + R) where R is the routing time of the day.
+
+'''
+
+
+class RunSession:
+    def __init__(self, context=None, manifest_cache=8):
+        self.context = context if context is not None else main.context
+        self.manifest_cache = manifest_cache
+        # Manifest file path -> (modification time, package hash table), least recently used first
+        self._manifests = OrderedDict()
+        # Package hash table -> {package ID: (street, zip)} as first loaded
+        self._originals = weakref.WeakKeyDictionary()
+
+    def manifest(self, manifest):
+        if not isinstance(manifest, (str, os.PathLike)):
+            packageHash = manifest
+        else:
+            path = os.path.abspath(manifest)
+            modified = os.path.getmtime(path)
+            cached = self._manifests.get(path)
+            if cached is not None and cached[0] == modified:
+                self._manifests.move_to_end(path)
+                packageHash = cached[1]
+            else:
+                packageHash = main.loadPackageData(path, table=main.HashTableWChains(
+                    indexed_attributes=main.PACKAGE_INDEXES))
+                self._manifests[path] = (modified, packageHash)
+                self._manifests.move_to_end(path)
+                if len(self._manifests) > self.manifest_cache:
+                    self._manifests.popitem(last=False)
+
+        self.context.useManifest(packageHash, manifest if isinstance(manifest, (str, os.PathLike)) else None)
+        originals = self._originals.get(packageHash)
+        if originals is None:
+            self._originals[packageHash] = {packageID: (package.street, package.zip)
+                                            for packageID, package in packageHash.items()}
+            return packageHash
+
+        # A manifest used before: clear the previous day's deliveries and restore the listed addresses
+        for packageID, package in packageHash.items():
+            package.deliveryTime = None
+            package.departureTime = None
+            package.status = main.LOADED_STATUS
+            street, zip = originals[packageID]
+            if package.street != street:
+                # Reindex this table directly: Packages.updateAddress only reindexes main.context's table
+                oldStreet = package.street
+                package.street = street
+                packageHash.reindex(packageID, "street", oldStreet)
+            package.zip = zip
+        return packageHash
+
+    def run(self, job):
+        started = time.perf_counter()
+        matrix = self.context.distanceMatrix
+        if matrix.index_of(job.depot) is None:
+            raise ValueError(f"Depot {job.depot!r} is not in the address book")
+        packageHash = self.manifest(job.manifest)
+        packages = [package for packageID, package in packageHash.items()]
+
+        start = job.start if job.start is not None else main.DAY_START
+        trips = job.trips
+        if trips is None:
+            trips = assign_packages(packages, matrix, capacity=main.TRUCK_CAPACITY, start=start,
+                                    correction_time=main.ADDRESS_CORRECTION_TIME)
+
+        # simulate_day routes against main.context, so run the job there
+        previous = main.context
+        main.context = self.context
+        try:
+            fleet = main.simulate_day(headless=True, trips=trips, depot=job.depot, truck_count=job.truck_count,
+                                      driver_count=job.driver_count, start=start)
+        finally:
+            main.context = previous
+
+        late = sorted(package.ID for package in packages if package.deadlineTime is not None
+                      and package.deliveryTime is not None and package.deliveryTime > package.deadlineTime)
+        delivered = sum(1 for package in packages if package.deliveryTime is not None)
+        miles = sum(truck.miles for truck in fleet.trucks.values())
+        return DayMetrics(job.date, job.depot, len(packages), delivered, round(miles, 1), fleet.finish, late,
+                          len(fleet.trips), time.perf_counter() - started)
+
+    def run_all(self, jobs):
+        return [self.run(job) for job in jobs]
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                    DAY SUMMARY FUNCTION                                        |
+#     | |                                      summarize(metrics)                                        |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function aggregates DayMetrics per date, in date order: the depots run that day,
+#     |                the packages, deliveries, miles, trips and seconds summed over the depots, the
+#     |                latest finish and the late package IDs of every depot (as (depot, ID) pairs).
+#     |
+#     |   Time Complexity: O(j log j) for j jobs
+# '''
+def summarize(metrics):
+    days = OrderedDict()
+    for day in sorted(metrics, key=lambda day: day.date):
+        days.setdefault(day.date, []).append(day)
+    summaries = []
+    for date, runs in days.items():
+        summaries.append(DaySummary(date, [day.depot for day in runs], sum(day.packages for day in runs),
+                                    sum(day.delivered for day in runs), round(sum(day.miles for day in runs), 1),
+                                    max(day.finish for day in runs),
+                                    [(day.depot, packageID) for day in runs for packageID in day.late],
+                                    sum(day.trips for day in runs), sum(day.seconds for day in runs)))
+    return summaries
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                    JOBS FILE FUNCTION                                          |
+#     | |                                  read_jobs(path, start)                                        |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function reads a jobs CSV file: one "date (YYYY-MM-DD), depot street, manifest
+#     |                file" row per job, optionally followed by the number of trucks and drivers. Manifest
+#     |                paths are relative to the jobs file. Rows starting with "#" are skipped. Without the
+#     |                counts (or a start), the job uses TRUCK_COUNT, DRIVER_COUNT and DAY_START.
+#     |
+#     |   Time Complexity: O(j) for j jobs
+# '''
+def read_jobs(path, start=None):
+    jobs = []
+    directory = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="") as jobsCSV:
+        for line_number, row in enumerate(csv.reader(jobsCSV), 1):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            if len(row) < 3:
+                raise ValueError(f"{path}, line {line_number}: expected date, depot and manifest")
+            try:
+                date = datetime.date.fromisoformat(row[0].strip())
+                truck_count = int(row[3]) if len(row) > 3 and row[3].strip() else None
+                driver_count = int(row[4]) if len(row) > 4 and row[4].strip() else None
+            except ValueError as e:
+                raise ValueError(f"{path}, line {line_number}: {e}") from None
+            manifest = os.path.join(directory, row[2].strip())
+            jobs.append(RunJob(date, row[1].strip(), manifest, None, truck_count, driver_count, start))
+    return jobs
+
+
+def _metrics_json(day):
+    values = day._asdict()
+    values["date"] = day.date.isoformat()
+    values["finish"] = str(day.finish)
+    return values
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay WGUPS delivery days against one loaded dataset.")
+    parser.add_argument("jobs", nargs="?", help="CSV file of date, depot, manifest rows")
+    parser.add_argument("--days", type=int, default=5, help="days to replay without a jobs file (default: 5)")
+    parser.add_argument("--output", help="write the per-job and per-day metrics to this JSON file")
+    args = parser.parse_args()
+
+    if args.jobs:
+        jobs = read_jobs(args.jobs, main.DAY_START)
+    else:
+        jobs = [RunJob(main.RUN_DATE + datetime.timedelta(days=day), main.HUB, main.context.package_file,
+                       main.TRUCK_TRIPS, main.TRUCK_COUNT, main.DRIVER_COUNT, main.DAY_START)
+                for day in range(args.days)]
+
+    session = RunSession()
+    metrics = session.run_all(jobs)
+    for day in summarize(metrics):
+        late = len(day.late)
+        print(f"{day.date}  {len(day.depots)} depot{'s' if len(day.depots) > 1 else ' '}  "
+              f"{day.delivered:>5}/{day.packages:<5} packages  {day.miles:>8.1f} miles  finish {day.finish}  "
+              f"late {late:<3} {day.seconds * 1000:8.1f} ms")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"jobs": [_metrics_json(day) for day in metrics],
+                       "days": [_metrics_json(day) for day in summarize(metrics)]}, output, indent=2)
@@ -0,0 +1,302 @@
+"""
+
+Description: Package Query Server for the WGUPS Parcel Service Program
+
+A headless query service over the package hash table and the status timeline of a simulated day.
+Clients send one JSON request per line and receive one JSON response per line, over a local TCP port
+or a Unix socket served with asyncio, so any number of clients can query concurrently. A request can
+batch many lookups by package ID, street, deadline or status at a given time, and the service keeps
+per-request latency metrics. QueryService.handle answers a request directly, without a socket.
+
+Usage: python server.py [--unix PATH | --host 127.0.0.1 --port 8765]
+
+Example request:  {"queries": [{"id": 9, "time": "10:25"}, {"status": "En-route", "time": "9:30"}]}
+Example response: {"results": [[{...package 9...}], [{...}, ...]], "latency_ms": 0.21}
+
+"""
+
+# Python core libraries - Functionality
+import argparse
+import asyncio
+import datetime
+import json
+import time
+from collections import deque
+
+# Project modules - Routing data
+import main
+from routing import parse_deadline
+from timeline import StatusTimeline
+
+# Status lookups without a time answer with the status at the end of the day
+END_OF_DAY = datetime.timedelta(hours=24)
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  QUERY TIME PARSING FUNCTION                                   |
+#     | |                                      parse_query_time(value)                                   |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function converts the "time" of a query into a timedelta since midnight. It
+#     |                accepts "HH:MM" or "HH:MM:SS" in 24-hour format, a clock time with AM / PM such as
+#     |                "10:30 AM", or a number of seconds since midnight. None means the end of the day.
+#     |                Times outside the day (0:00 to 24:00) raise ValueError.
+#     |
+#     |   Time Complexity: O(1)
+# '''
+def parse_query_time(value):
+    if value is None:
+        return END_OF_DAY
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Also rejects NaN and the infinity JSON numbers like 1e400 parse to
+        if not 0 <= value <= END_OF_DAY.total_seconds():
+            raise ValueError(f"invalid time {value!r}, expected 0 to 86400 seconds")
+        return datetime.timedelta(seconds=value)
+    if not isinstance(value, str):
+        raise ValueError(f"invalid time {value!r}")
+    text = value.strip().upper()
+    if text.endswith(("AM", "PM")):
+        # parse_deadline checks the hours (1 to 12) and minutes of the clock time
+        try:
+            return parse_deadline(text)
+        except ValueError:
+            raise ValueError(f"invalid time {value!r}, expected H:MM AM or PM") from None
+    parts = text.split(":")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"invalid time {value!r}, expected HH:MM")
+    hours, minutes, seconds = (int(part) for part in parts + ["0"] * (3 - len(parts)))
+    if hours > 24 or minutes > 59 or seconds > 59 or (hours == 24 and (minutes or seconds)):
+        raise ValueError(f"invalid time {value!r}")
+    return datetime.timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                  LATENCY METRICS CLASS                                         |
+    |                                  Time Complexity: O(1)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class keeps the number of requests and queries answered, the total and maximum
+                 request latency, and the latencies of the last `window` requests for percentiles.
+    Methods:
+        1. record: Adds one request with its number of queries and its latency in seconds.
+        2. snapshot: Returns the counters and the 50th / 95th / 99th percentile latency in milliseconds.
+
+    Time Complexity:
+        - record: O(1)
+        - snapshot: O(w log w) for a window of w requests.
+
+'''
+
+
+class LatencyMetrics:
+    def __init__(self, window=1024):
+        self.requests = 0
+        self.queries = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, queries, seconds, error=False):
+        self.requests += 1
+        self.queries += queries
+        self.errors += 1 if error else 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self):
+        recent = sorted(self.recent)
+
+        def percentile(share):
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(share * len(recent)))] * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.requests * 1000, 3) if self.requests else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                   QUERY SERVICE CLASS                                          |
+    |                               Time Complexity: O(k log e) per query                            |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class answers package queries against a package hash table (HashTableWChains with
+                 street and deadline indexes) and the StatusTimeline of the simulated day. It never
+                 modifies the packages, so concurrent clients share one instance. A query is a JSON
+                 object with one of:
+
+                   - "id": a package ID, looked up with HashTableWChains.search;
+                   - "street": a street address, looked up in the street index (packages moved to the
+                     street by an address correction are found too, from the time of the correction);
+                   - "deadline": a deadline such as "10:30 AM" or "EOD", looked up in the deadline index;
+                   - "status": "Hub", "En-route" or "Delivered", from a timeline snapshot;
+
+                 and an optional "time" (see parse_query_time). Each query yields a list of package
+                 objects (the PackageStatus fields at that time), or {"error": ...} when it is invalid.
+                 A request is a single query or {"queries": [...]}; {"metrics": true} returns the
+                 latency metrics.
+    Methods:
+        1. __init__: Stores the table and timeline and indexes the corrected streets.
+        2. query: Answers one query.
+        3. handle: Answers a request and records its latency.
+        4. handle_line: Answers one JSON-encoded request line with one JSON-encoded response line.
+
+    Time Complexity:
+        - query: O(k log e) for k matching packages with e events each; status queries O(n + e).
+        - handle: O(q) queries.
+
+'''
+
+
+class QueryService:
+    def __init__(self, packageHash, timeline, address_history=None):
+        self.packageHash = packageHash
+        self.timeline = timeline
+        self.metrics = LatencyMetrics()
+        self._corrected = {}
+        for packageID, history in (address_history or {}).items():
+            for changeTime, street, zip in history[1:]:
+                self._corrected.setdefault(street, []).append(packageID)
+
+    def query(self, query):
+        if not isinstance(query, dict):
+            raise ValueError("a query must be a JSON object")
+        when = parse_query_time(query.get("time"))
+
+        if "id" in query:
+            try:
+                packageID = int(query["id"])
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"invalid package ID {query['id']!r}") from None
+            if self.packageHash.search(packageID) is None:
+                raise ValueError(f"unknown package ID {packageID}")
+            packageIDs = [packageID]
+        elif "street" in query:
+            street = str(query["street"])
+            candidates = self.packageHash.get_package_ids_by_street(street) + self._corrected.get(street, [])
+            packageIDs = [packageID for packageID in sorted(set(candidates))
+                          if self.timeline.status_at(packageID, when).street == street]
+        elif "deadline" in query:
+            deadline = str(query["deadline"]).strip().upper()
+            packageIDs = sorted(self.packageHash.get_keys_by("deadline", deadline))
+        elif "status" in query:
+            status = str(query["status"]).strip().lower()
+            statuses = self.timeline.statuses_at(when)
+            packageIDs = [packageID for packageID, value in statuses.items() if value.lower() == status]
+        else:
+            raise ValueError("a query needs one of 'id', 'street', 'deadline' or 'status'")
+
+        return [_package_json(self.timeline.status_at(packageID, when)) for packageID in packageIDs]
+
+    def handle(self, request):
+        started = time.perf_counter()
+        if isinstance(request, dict) and request.get("metrics"):
+            return {"metrics": self.metrics.snapshot()}
+
+        batch = isinstance(request, dict) and "queries" in request
+        queries = request["queries"] if batch else [request]
+        if not isinstance(queries, list):
+            queries = [queries]
+        results = []
+        failed = False
+        for query in queries:
+            try:
+                results.append(self.query(query))
+            except (ValueError, OverflowError) as e:
+                results.append({"error": str(e)})
+                failed = True
+
+        seconds = time.perf_counter() - started
+        self.metrics.record(len(queries), seconds, failed)
+        response = {"results": results} if batch else {"result": results[0]}
+        response["latency_ms"] = round(seconds * 1000, 3)
+        return response
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.metrics.record(0, 0.0, True)
+            response = {"error": f"invalid JSON: {e}"}
+        else:
+            response = self.handle(request)
+        return (json.dumps(response) + "\n").encode("utf-8")
+
+
+def _package_json(status):
+    package = status._asdict()
+    for name in ("departureTime", "deliveryTime"):
+        if package[name] is not None:
+            package[name] = str(package[name])
+    return package
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                     SERVER FUNCTIONS                                           |
+#     | |                      serve(service, path, host, port) / build_service()                        |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: serve starts an asyncio server for the service on a Unix socket (path) or a TCP port
+#     |                on host (127.0.0.1 by default; port 0 picks a free port) and returns the
+#     |                asyncio.Server. Every connection reads request lines and writes response lines until
+#     |                the client closes it. build_service simulates the configured day headless and returns
+#     |                a QueryService over the delivered packages.
+#     |
+#     |   Time Complexity: O(1) per connection, plus the queries
+# '''
+async def serve(service, path=None, host="127.0.0.1", port=8765):
+    async def client(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(service.handle_line(line))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError, OverflowError):
+            pass  # A client that disconnects or sends an oversized line only loses its own connection
+        finally:
+            writer.close()
+
+    if path is not None:
+        return await asyncio.start_unix_server(client, path=path, limit=1 << 20)
+    return await asyncio.start_server(client, host, port, limit=1 << 20)
+
+
+def build_service():
+    main.simulate_day(headless=True)
+    packageHash = main.context.packageHash
+    timeline = StatusTimeline((package for packageID, package in packageHash.items()), main.ADDRESS_HISTORY)
+    return QueryService(packageHash, timeline, main.ADDRESS_HISTORY)
+
+
+async def _run(args):
+    service = build_service()
+    server = await serve(service, path=args.unix, host=args.host, port=args.port)
+    where = args.unix or ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Serving package queries on {where}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve WGUPS package queries as JSON lines.")
+    parser.add_argument("--unix", help="Unix socket path to listen on instead of a TCP port")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on (default: 8765)")
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,264 @@
+"""
+
+Description: Spatial Candidate Index Module for the WGUPS Parcel Service Program
+
+Lets the nearest-neighbor router look at the stops near the truck first instead of scanning every
+remaining stop. Every address gets a point in an embedding whose distances are a lower bound of the
+road distances: its coordinates (CoordinateDistances), or its distances to a few landmark addresses
+(any other distance provider). A k-d tree over the points of a truck's stops proposes candidates in
+order of that lower bound, and the search stops as soon as the bound of the next candidate exceeds
+the best road distance found. Stops it skips are strictly farther than the chosen one, so the choice,
+ties included, is the same as the exhaustive scan's.
+
+"""
+
+# Python core libraries - Functionality
+import math
+from collections import namedtuple
+from heapq import heappop, heappush
+
+# Project modules - Routing data
+from providers import EARTH_RADIUS_MILES, CoordinateDistances, SparseDistanceGraph
+from routing import _load_numpy
+
+# A point per address index, the norm of the embedding (2 for Euclidean, math.inf for Chebyshev) and
+# the guarantee it comes with: distance(a, b) >= scale * norm(points[a] - points[b]) - slack.
+Embedding = namedtuple("Embedding", ["points", "norm", "scale", "slack"])
+
+# Allowance for floating-point rounding when a lower bound equals the distance it bounds
+ROUNDING = 1e-9
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  EMBEDDING FUNCTIONS                                           |
+#     | |     coordinate_embedding(provider) / landmark_embedding(matrix, landmarks) / embedding_for     |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: coordinate_embedding returns the coordinates of a CoordinateDistances provider. For
+#     |                haversine distances the points are placed on a sphere of the Earth's radius, where
+#     |                the straight chord between two points is never longer than the great-circle distance.
+#     |                Without an exact source the estimates times the road factor are the distances, so
+#     |                the factor is the scale; with one, road distances are assumed to be no shorter than
+#     |                the straight line (scale 1).
+#     |
+#     |                landmark_embedding picks `landmarks` addresses spread over the map (each one the
+#     |                farthest from those already picked, starting at the hub, address 0) and gives every
+#     |                address its distances to them, compared with the Chebyshev norm: by the triangle
+#     |                inequality, |d(a, l) - d(b, l)| <= d(a, b) for every landmark l. A distance table
+#     |                does not always obey it (the WGU table has shortcuts), so for a dense matrix the
+#     |                largest violation is measured over all pairs and kept as the slack. The paths of a
+#     |                SparseDistanceGraph obey it, but its neighbor distances can be longer than a path
+#     |                through other neighbors, so its slack is the largest such excess. Other providers
+#     |                are assumed to obey it.
+#     |
+#     |                embedding_for returns the coordinate embedding for a CoordinateDistances provider
+#     |                and the landmark embedding for any other.
+#     |
+#     |   Time Complexity: coordinate_embedding O(n); landmark_embedding O(n m) row lookups for m
+#     |                    landmarks, plus O(n^2 m) for the slack of a dense matrix or one search
+#     |                    around every address of a sparse graph
+# '''
+def coordinate_embedding(provider):
+    scale = provider.factor if provider.exact is None else 1.0
+    if provider.metric == "euclidean":
+        return Embedding([tuple(point) for point in provider.points], 2, scale, 0.0)
+    points = [(EARTH_RADIUS_MILES * math.cos(lat) * math.cos(lon),
+               EARTH_RADIUS_MILES * math.cos(lat) * math.sin(lon),
+               EARTH_RADIUS_MILES * math.sin(lat)) for lat, lon in provider._radians]
+    return Embedding(points, 2, scale, 0.0)
+
+
+def landmark_embedding(matrix, landmarks=8):
+    size = matrix.size
+    rows = [list(matrix.row(0))]
+    # Distance from every address to its nearest landmark, for the farthest-point choice
+    nearest = list(rows[0])
+    while len(rows) < min(landmarks, size):
+        landmark = max(range(size), key=nearest.__getitem__)
+        if nearest[landmark] <= 0.0:
+            break  # Every address is at a landmark already
+        rows.append(list(matrix.row(landmark)))
+        nearest = [min(a, b) for a, b in zip(nearest, rows[-1])]
+    points = [tuple(row[addy] for row in rows) for addy in range(size)]
+    if matrix.dense:
+        slack = _landmark_slack(matrix, rows)
+    elif isinstance(matrix, SparseDistanceGraph):
+        slack = _graph_slack(matrix)
+    else:
+        slack = 0.0
+    return Embedding(points, math.inf, 1.0, slack)
+
+
+def _landmark_slack(matrix, rows):
+    # Largest |d(a, l) - d(b, l)| - d(a, b) over all address pairs and landmarks
+    size = matrix.size
+    numpy = _load_numpy()
+    slack = 0.0
+    if numpy is not None:
+        distances = numpy.frombuffer(matrix.values, dtype=numpy.float64).reshape(size, size)
+        columns = [numpy.asarray(row, dtype=numpy.float64) for row in rows]
+        for first in range(0, size, 256):
+            block = distances[first:first + 256]
+            for column in columns:
+                violation = numpy.abs(column[first:first + 256, None] - column[None, :]) - block
+                slack = max(slack, float(violation.max()))
+        return slack
+    for a in range(size):
+        rowA = matrix.row(a)
+        for row in rows:
+            landmarkA = row[a]
+            for b in range(size):
+                violation = abs(landmarkA - row[b]) - rowA[b]
+                if violation > slack:
+                    slack = violation
+    return slack
+
+
+def _graph_slack(graph):
+    # Largest excess of a neighbor distance over the shortest path to that neighbor. Each address only
+    # needs a search within the radius of its farthest neighbor.
+    slack = 0.0
+    neighbors = graph.neighbors
+    for source, direct in enumerate(neighbors):
+        if not direct:
+            continue
+        radius = max(direct.values())
+        settled = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            distance, addy = heappop(heap)
+            if addy in settled:
+                continue
+            settled[addy] = distance
+            for other, weight in neighbors[addy].items():
+                candidate = distance + weight
+                if candidate <= radius and candidate < best.get(other, math.inf):
+                    best[other] = candidate
+                    heappush(heap, (candidate, other))
+        for other, weight in direct.items():
+            slack = max(slack, weight - settled.get(other, weight))
+    return slack
+
+
+def embedding_for(matrix, landmarks=8):
+    if isinstance(matrix, CoordinateDistances):
+        return coordinate_embedding(matrix)
+    return landmark_embedding(matrix, landmarks)
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                 CANDIDATE INDEX CLASS                                          |
+    |                              Time Complexity: O(k log n) per query                             |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class is a k-d tree over the embedded points of a truck's stops (by stop position),
+                 split on the widest dimension down to leaves of leaf_size stops, and is passed to
+                 routing.NearestNeighborRouter as its candidate index. Visited stops are removed from
+                 the tree, and subtrees without remaining stops are skipped. nearest() visits the tree
+                 best-first by the lower bound of each subtree's bounding box, and evaluates the road
+                 distance of a stop only when its own lower bound does not exceed the best distance
+                 found so far. Equal distances go to the stop loaded last, like the exhaustive scan of
+                 NearestNeighborRouter.
+    Methods:
+        1. __init__: Builds the tree over the stops' points.
+        2. remove: Removes a visited stop position.
+        3. nearest: Returns the nearest remaining stop position from an address index, given a function
+                    from stop position to road distance, and the number of road distances evaluated.
+
+    Time Complexity:
+        - __init__: O(n log^2 n)
+        - remove: O(log n)
+        - nearest: O(k log n) for k evaluated candidates; O(n) when the bound prunes nothing.
+
+'''
+
+
+class CandidateIndex:
+    def __init__(self, embedding, stops, leaf_size=8):
+        self.embedding = embedding
+        self.norm = embedding.norm
+        self.scale = embedding.scale
+        self.slack = embedding.slack + ROUNDING
+        self.points = [embedding.points[addy] for addy in stops]
+        self.leaf_size = leaf_size
+        self.removed = bytearray(len(self.points))
+        # Tree nodes by index: bounding box, children (None for a leaf), stop positions of a leaf,
+        # remaining stops in the subtree and parent node
+        self._low = []
+        self._high = []
+        self._children = []
+        self._items = []
+        self._alive = []
+        self._parent = []
+        self._leafOf = [0] * len(self.points)
+        if self.points:
+            self._build(list(range(len(self.points))), -1)
+
+    def _build(self, positions, parent):
+        node = len(self._low)
+        points = [self.points[position] for position in positions]
+        low = tuple(map(min, zip(*points)))
+        high = tuple(map(max, zip(*points)))
+        self._low.append(low)
+        self._high.append(high)
+        self._alive.append(len(positions))
+        self._parent.append(parent)
+        self._children.append(None)
+        self._items.append(None)
+        if len(positions) <= self.leaf_size:
+            self._items[node] = positions
+            for position in positions:
+                self._leafOf[position] = node
+            return node
+        axis = max(range(len(low)), key=lambda dimension: high[dimension] - low[dimension])
+        positions.sort(key=lambda position: self.points[position][axis])
+        middle = len(positions) // 2
+        self._children[node] = (self._build(positions[:middle], node), self._build(positions[middle:], node))
+        return node
+
+    def remove(self, position):
+        if self.removed[position]:
+            return
+        self.removed[position] = 1
+        node = self._leafOf[position]
+        while node >= 0:
+            self._alive[node] -= 1
+            node = self._parent[node]
+
+    def _gap(self, offsets):
+        if self.norm == 2:
+            return self.scale * math.sqrt(sum(offset * offset for offset in offsets)) - self.slack
+        return self.scale * max(offsets) - self.slack
+
+    def nearest(self, current, distance):
+        point = self.embedding.points[current]
+        best = None
+        bestDistance = math.inf
+        evaluated = 0
+        if not self._alive or not self._alive[0]:
+            return best, evaluated
+        heap = [(-math.inf, 0)]
+        while heap:
+            bound, node = heappop(heap)
+            if bound > bestDistance:
+                break
+            children = self._children[node]
+            if children is None:
+                for position in self._items[node]:
+                    if self.removed[position]:
+                        continue
+                    if self._gap([abs(a - b) for a, b in zip(point, self.points[position])]) > bestDistance:
+                        continue
+                    value = distance(position)
+                    evaluated += 1
+                    if best is None or value < bestDistance or (value == bestDistance and position > best):
+                        best, bestDistance = position, value
+                continue
+            for child in children:
+                if self._alive[child]:
+                    gaps = [max(low - q, 0.0, q - high)
+                            for q, low, high in zip(point, self._low[child], self._high[child])]
+                    heappush(heap, (self._gap(gaps), child))
+        return best, evaluated
@@ -0,0 +1,114 @@
+"""
+
+Description: Status Log Module for the WGUPS Parcel Service Program
+
+Typed records for the status logs of truckDeliverPackages (a truck stopping at an address, a package
+delivered, a truck back at the hub) with numeric time and mileage fields, and writers that export
+them in bulk or stream them to CSV or JSON Lines files without formatting and re-parsing strings.
+
+"""
+
+# Python core libraries - Functionality
+import csv
+import datetime
+import json
+from collections import namedtuple
+
+# One status log entry: the truck number, the event ("stopped", "delivered" or "return"), the time in
+# seconds since midnight, the truck's odometer in miles, the street (None for deliveries) and the
+# package ID (None for stops and returns).
+StatusRecord = namedtuple("StatusRecord", ["truck", "event", "time", "miles", "street", "package"])
+
+STATUS_FIELDS = StatusRecord._fields
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                   TIME FORMATTING FUNCTION                                     |
+#     | |                                     format_time(seconds)                                       |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: This function formats a record time (seconds since midnight) the way a timedelta is
+#     |                printed, e.g. 9:58:00, as shown in the status tables.
+#     |
+#     |   Time Complexity: O(1)
+# '''
+def format_time(seconds):
+    return str(datetime.timedelta(seconds=seconds))
+
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                  STATUS LOG WRITER CLASS                                       |
+    |                                  Time Complexity: O(1)                                         |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class streams StatusRecord objects to a file as they are produced, as CSV (a header
+                 row with the record fields, then one row per record) or as JSON Lines (one JSON object
+                 per line). The format is taken from the file name (.csv, otherwise JSON Lines) unless
+                 given. It can be used as a context manager; the file is closed on exit.
+    Methods:
+        1. __init__: Opens the file and writes the CSV header.
+        2. write: Writes one record.
+        3. write_all: Writes every record of an iterable.
+        4. close: Flushes and closes the file.
+
+    Time Complexity:
+        - write: O(1)
+        - write_all: O(n)
+
+'''
+
+
+class StatusLogWriter:
+    def __init__(self, path, format=None, append=False):
+        self.format = format or ("csv" if str(path).lower().endswith(".csv") else "jsonl")
+        if self.format not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown status log format {self.format!r}; use 'csv' or 'jsonl'")
+        self.file = open(path, "a" if append else "w", newline="")
+        self.count = 0
+        if self.format == "csv":
+            self._writer = csv.writer(self.file)
+            if self.file.tell() == 0:
+                self._writer.writerow(STATUS_FIELDS)
+
+    def write(self, record):
+        if self.format == "csv":
+            self._writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record._asdict()) + "\n")
+        self.count += 1
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# '''
+#     | ,------------------------------------------------------------------------------------------------,
+#     | |                                  BULK EXPORT FUNCTIONS                                         |
+#     | |                         export_csv(records, path) / export_jsonl(records, path)                |
+#     | '------------------------------------------------------------------------------------------------'
+#     |   Description: These functions write a whole list of StatusRecord objects to a CSV or JSON Lines file
+#     |                and return the number of records written.
+#     |
+#     |   Time Complexity: O(n)
+# '''
+def export_csv(records, path):
+    with StatusLogWriter(path, "csv") as writer:
+        writer.write_all(records)
+        return writer.count
+
+
+def export_jsonl(records, path):
+    with StatusLogWriter(path, "jsonl") as writer:
+        writer.write_all(records)
+        return writer.count
@@ -0,0 +1,136 @@
+"""
+
+Description: Package Status Timeline Module for the WGUPS Parcel Service Program
+
+Builds an immutable timeline of events for every package once the delivery simulation has run
+(departure from the hub, delivery, and address corrections such as package 9's wrong address) and
+answers "what was this package's status at time T" with a binary search over the sorted event
+times. Queries never modify the packages, so any number of threads can share one timeline.
+
+"""
+
+# Python core libraries - Functionality
+import datetime
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# Read-only view of a package at a point in time; it has the same attribute names as Packages, so the
+# table printers in main.py accept it in place of a package object.
+PackageStatus = namedtuple("PackageStatus", ["ID", "street", "city", "state", "zip", "deadline", "weight", "notes",
+                                             "status", "departureTime", "deliveryTime"])
+
+'''
+    ,------------------------------------------------------------------------------------------------,
+    |                                   STATUS TIMELINE CLASS                                        |
+    |                                  Time Complexity: O(log k)                                     |
+    '------------------------------------------------------------------------------------------------'
+
+    Description: This class stores, per package ID, a sorted tuple of status event times with the status
+                 that starts at each time ("Hub" from midnight, "En-route" from departure, "Delivered"
+                 from delivery), and a sorted tuple of address change times with the street and zip code
+                 that apply after each change. Everything is built in __init__ and stored in tuples, so
+                 the timeline is never modified by a query.
+
+                 A status applies from its event time onwards (a package is "En-route" at exactly its
+                 departure time), while an address correction applies strictly after its time, which is
+                 how Packages.statusUpdate treats the package 9 correction at 10:20.
+
+                 The departure and delivery events of all packages are also kept in one list sorted by
+                 time, so fleet-wide snapshots are answered by sweeping that list once instead of
+                 querying every package separately.
+    Methods:
+        1. __init__: Builds the timeline from delivered package objects and their address histories.
+        2. status_at: Returns the PackageStatus of one package at a time.
+        3. all_at: Returns the PackageStatus of every package at a time, in package ID order.
+        4. ids: Returns the package IDs in the timeline.
+        5. statuses_at: Returns {package ID: status} for every package at a time.
+        6. statuses_at_times: Returns {package ID: status} for every package at each of several times.
+
+    Time Complexity:
+        - __init__: O(n) where n is the number of packages.
+        - status_at: O(log k) where k is the number of events of the package.
+        - all_at: O(n log k)
+        - ids: O(1)
+        - statuses_at: O(n + e) where e is the number of events.
+        - statuses_at_times: O(t log t + e + t * n) for t times, with the event list swept once.
+
+'''
+
+
+class StatusTimeline:
+    def __init__(self, packages, address_history=None):
+        address_history = address_history or {}
+        midnight = datetime.timedelta(0)
+        details = {}
+        statuses = {}
+        addresses = {}
+        for package in packages:
+            details[package.ID] = (package.city, package.state, package.deadline, package.weight, package.notes,
+                                   package.departureTime, package.deliveryTime)
+
+            if package.deliveryTime is None:
+                statuses[package.ID] = ((midnight,), ("Hub",))
+            else:
+                departure = package.departureTime if package.departureTime is not None else package.deliveryTime
+                statuses[package.ID] = ((midnight, departure, package.deliveryTime), ("Hub", "En-route", "Delivered"))
+
+            history = address_history.get(package.ID)
+            if history:
+                history = sorted(history)
+                addresses[package.ID] = (tuple(changeTime for changeTime, street, zip in history),
+                                         tuple((street, zip) for changeTime, street, zip in history))
+            else:
+                addresses[package.ID] = ((midnight,), ((package.street, package.zip),))
+
+        # Fleet-wide event list: (time, rank, package ID, status), departures ranked before deliveries
+        events = []
+        for packageID, (times, states) in statuses.items():
+            for rank, (eventTime, status) in enumerate(zip(times[1:], states[1:])):
+                events.append((eventTime, rank, packageID, status))
+        events.sort()
+
+        self._ids = tuple(sorted(details))
+        self._events = tuple(events)
+        self._details = details
+        self._statuses = statuses
+        self._addresses = addresses
+
+    def status_at(self, packageID, time):
+        details = self._details.get(packageID)
+        if details is None:
+            return None
+        city, state, deadline, weight, notes, departureTime, deliveryTime = details
+
+        times, states = self._statuses[packageID]
+        status = states[max(bisect_right(times, time) - 1, 0)]
+
+        # The first address entry is the original address and applies until the first correction
+        times, streets = self._addresses[packageID]
+        street, zip = streets[max(bisect_left(times, time) - 1, 0)]
+
+        return PackageStatus(packageID, street, city, state, zip, deadline, weight, notes, status, departureTime,
+                             deliveryTime)
+
+    def all_at(self, time):
+        return [self.status_at(packageID, time) for packageID in self._ids]
+
+    def ids(self):
+        return self._ids
+
+    def statuses_at(self, time):
+        return self.statuses_at_times([time])[0]
+
+    def statuses_at_times(self, times):
+        times = list(times)
+        events = self._events
+        state = dict.fromkeys(self._ids, "Hub")
+        results = [None] * len(times)
+        e = 0
+        # Visit the requested times in increasing order, applying each event once
+        for index in sorted(range(len(times)), key=times.__getitem__):
+            while e < len(events) and events[e][0] <= times[index]:
+                eventTime, rank, packageID, status = events[e]
+                state[packageID] = status
+                e += 1
+            results[index] = dict(state)
+        return results